@@ -4,21 +4,42 @@ API Integration Module
 This module handles interactions with language model APIs.
 """
 
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+import httpx
 import os
-from typing import List, Dict, Any
+import asyncio
+import inspect
+import time
+import hashlib
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+from utils.json_utils import json_dumps
 
 class APIClient:
     """Handles interactions with language model APIs."""
     
+    # Maximum number of cached completions kept in memory
+    CACHE_MAX_SIZE = 512
+    # Only completions at or below this temperature are deterministic enough to cache
+    CACHE_MAX_TEMPERATURE = 0.0
+    
     def __init__(self, config_manager):
         """Initialize API client with configuration manager."""
         self.config_manager = config_manager
         self.client = None
+        self._http = None
+        self.aclient = None
+        self._ahttp = None
+        self._aclose_task = None
+        self._response_cache = OrderedDict()
+        self.cache_stats = {"hits": 0, "misses": 0}
         self._initialize_client()
     
     def _initialize_client(self):
         """Initialize the API client based on configuration."""
+        if self.client is not None:
+            return
+        
         provider = self.config_manager.get("api", "provider", "openrouter")
         base_url = self.config_manager.get("api", "base_url", "https://openrouter.ai/api/v1")
         api_key = self.config_manager.get_api_key()
@@ -26,11 +47,76 @@ class APIClient:
         if not api_key:
             raise ValueError("API key not found. Please set the appropriate environment variable.")
         
+        # Reuse keep-alive connections across requests instead of
+        # paying a fresh TCP + TLS handshake on every call
+        if self._http is None:
+            self._http = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=50,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=30
+                ),
+                timeout=httpx.Timeout(120.0)
+            )
+        
         self.client = OpenAI(
             api_key=api_key,
-            base_url=base_url
+            base_url=base_url,
+            http_client=self._http
         )
     
+    def close(self) -> None:
+        """Close the underlying HTTP connection pools, including the asynchronous one."""
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+        self.client = None
+        
+        if self._ahttp is not None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                try:
+                    asyncio.run(self.aclose())
+                except RuntimeError:
+                    # The pool's connections belong to an event loop that has
+                    # already finished; async callers should use aclose()
+                    pass
+            else:
+                # Called from async code; keep a reference so the task is not
+                # garbage-collected and can be awaited via _aclose_task
+                self._aclose_task = loop.create_task(self.aclose())
+    
+    def prewarm(self) -> None:
+        """
+        Pre-establish a pooled connection to the API endpoint.
+        
+        Best-effort; meant to run in the background at startup so the first
+        real request does not pay for the TCP + TLS handshake.
+        """
+        if not self.client:
+            self._initialize_client()
+        base_url = self.config_manager.get("api", "base_url", "https://openrouter.ai/api/v1")
+        
+        try:
+            self._http.head(base_url)
+        except httpx.HTTPError:
+            # Real requests report their own errors
+            pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+        self.close()
+    
     def get_completion(self, messages: List[Dict[str, str]], temperature: float = 0.7) -> str:
         """
         Get completion from the language model API.
@@ -47,6 +133,12 @@ class APIClient:
             
         model = self.config_manager.get("api", "model", "tngtech/deepseek-r1t-chimera:free")
         
+        # Serve deterministic repeats from the response cache
+        cache_key = self._cache_key(model, messages, temperature)
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             response = self.client.chat.completions.create(
                 model=model,
@@ -54,24 +146,75 @@ class APIClient:
                 temperature=temperature
             )
             
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
         except Exception as e:
             return f"Error: Failed to get completion from API. {str(e)}"
+        
+        self._store_cached(cache_key, content)
+        return content
+    
+    def clear_cache(self) -> None:
+        """Clear cached completions and reset cache statistics."""
+        self._response_cache.clear()
+        self.cache_stats = {"hits": 0, "misses": 0}
+    
+    def _cache_key(self, model: str, messages: List[Dict[str, str]], temperature: float) -> Optional[str]:
+        """Build a stable cache key for a completion request, or None if it is not cacheable."""
+        if temperature > self.CACHE_MAX_TEMPERATURE:
+            return None
+        
+        payload = json_dumps(
+            {"model": model, "messages": messages, "temperature": temperature},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload).hexdigest()
+    
+    def _get_cached(self, cache_key: Optional[str]) -> Optional[str]:
+        """Look up a cached completion and record the hit or miss."""
+        if cache_key is None:
+            return None
+        
+        cached = self._response_cache.get(cache_key)
+        if cached is None:
+            self.cache_stats["misses"] += 1
+            return None
+        
+        self._response_cache.move_to_end(cache_key)
+        self.cache_stats["hits"] += 1
+        return cached
     
-    def get_streaming_completion(self, messages: List[Dict[str, str]], callback, temperature: float = 0.7):
+    def _store_cached(self, cache_key: Optional[str], content: Optional[str]) -> None:
+        """Store a completion in the cache, evicting the least recently used entry."""
+        if cache_key is None or content is None:
+            return
+        
+        self._response_cache[cache_key] = content
+        if len(self._response_cache) > self.CACHE_MAX_SIZE:
+            self._response_cache.popitem(last=False)
+    
+    def get_streaming_completion(self, messages: List[Dict[str, str]], callback, temperature: float = 0.7,
+                                 batch_size: int = 8, flush_interval: float = 0.016):
         """
         Get streaming completion from the language model API.
         
+        Chunks are coalesced so the callback runs at most once per batch_size
+        chunks or flush_interval seconds, instead of once per token.
+        
         Args:
             messages: List of message dictionaries with 'role' and 'content' keys
-            callback: Function to call with each chunk of the response
+            callback: Function to call with each batch of the response
             temperature: Controls randomness (0.0 = deterministic, 1.0 = creative)
+            batch_size: Maximum number of chunks per callback (1 disables batching)
+            flush_interval: Maximum seconds to hold buffered chunks
         """
         if not self.client:
             self._initialize_client()
             
         model = self.config_manager.get("api", "model", "tngtech/deepseek-r1t-chimera:free")
         
+        buffer = []
+        last_flush = time.monotonic()
+        
         try:
             response = self.client.chat.completions.create(
                 model=model,
@@ -82,6 +225,160 @@ class APIClient:
             
             for chunk in response:
                 if chunk.choices and chunk.choices[0].delta.content:
-                    callback(chunk.choices[0].delta.content)
+                    buffer.append(chunk.choices[0].delta.content)
+                    now = time.monotonic()
+                    if len(buffer) >= batch_size or now - last_flush >= flush_interval:
+                        text = ''.join(buffer)
+                        buffer.clear()
+                        last_flush = now
+                        callback(text)
+            
+            if buffer:
+                text = ''.join(buffer)
+                buffer.clear()
+                callback(text)
         except Exception as e:
+            # Deliver whatever arrived before the failure ahead of the error
+            if buffer:
+                callback(''.join(buffer))
             callback(f"\nError: Failed to get streaming completion from API. {str(e)}")
+    
+    def _initialize_async_client(self):
+        """Initialize the asynchronous API client based on configuration."""
+        if self.aclient is not None:
+            return
+        
+        base_url = self.config_manager.get("api", "base_url", "https://openrouter.ai/api/v1")
+        api_key = self.config_manager.get_api_key()
+        
+        if not api_key:
+            raise ValueError("API key not found. Please set the appropriate environment variable.")
+        
+        # A larger pool lets background calls (topic classification,
+        # relevance scoring, main chat) overlap instead of serializing
+        if self._ahttp is None:
+            self._ahttp = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=200,
+                    max_keepalive_connections=100,
+                    keepalive_expiry=30
+                ),
+                timeout=httpx.Timeout(120.0)
+            )
+        
+        self.aclient = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=self._ahttp
+        )
+    
+    async def aprewarm(self) -> None:
+        """
+        Pre-establish a connection to the API endpoint.
+        
+        Intended to be scheduled as a background task at startup
+        (e.g. ``asyncio.create_task(api_client.aprewarm())``) so the first
+        real request does not pay for the TCP + TLS handshake.
+        """
+        self._initialize_async_client()
+        base_url = self.config_manager.get("api", "base_url", "https://openrouter.ai/api/v1")
+        
+        try:
+            await self._ahttp.head(base_url)
+        except httpx.HTTPError:
+            # Prewarming is best-effort; real requests report their own errors
+            pass
+    
+    async def aclose(self) -> None:
+        """Close the asynchronous HTTP connection pool."""
+        ahttp, self._ahttp, self.aclient = self._ahttp, None, None
+        if ahttp is not None:
+            await ahttp.aclose()
+    
+    async def aget_completion(self, messages: List[Dict[str, str]], temperature: float = 0.7) -> str:
+        """
+        Asynchronously get completion from the language model API.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content' keys
+            temperature: Controls randomness (0.0 = deterministic, 1.0 = creative)
+            
+        Returns:
+            Generated text response
+        """
+        self._initialize_async_client()
+        
+        model = self.config_manager.get("api", "model", "tngtech/deepseek-r1t-chimera:free")
+        
+        cache_key = self._cache_key(model, messages, temperature)
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self.aclient.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature
+            )
+            
+            content = response.choices[0].message.content
+        except Exception as e:
+            return f"Error: Failed to get completion from API. {str(e)}"
+        
+        self._store_cached(cache_key, content)
+        return content
+    
+    async def aget_streaming_completion(self, messages: List[Dict[str, str]], callback, temperature: float = 0.7,
+                                        batch_size: int = 8, flush_interval: float = 0.016):
+        """
+        Asynchronously get streaming completion from the language model API.
+        
+        Chunks are batched the same way as in get_streaming_completion.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content' keys
+            callback: Function or coroutine function to call with each batch of the response
+            temperature: Controls randomness (0.0 = deterministic, 1.0 = creative)
+            batch_size: Maximum number of chunks per callback (1 disables batching)
+            flush_interval: Maximum seconds to hold buffered chunks
+        """
+        self._initialize_async_client()
+        
+        model = self.config_manager.get("api", "model", "tngtech/deepseek-r1t-chimera:free")
+        
+        async def emit(text):
+            result = callback(text)
+            if inspect.isawaitable(result):
+                await result
+        
+        buffer = []
+        last_flush = time.monotonic()
+        
+        try:
+            response = await self.aclient.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                stream=True
+            )
+            
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    buffer.append(chunk.choices[0].delta.content)
+                    now = time.monotonic()
+                    if len(buffer) >= batch_size or now - last_flush >= flush_interval:
+                        text = ''.join(buffer)
+                        buffer.clear()
+                        last_flush = now
+                        await emit(text)
+            
+            if buffer:
+                text = ''.join(buffer)
+                buffer.clear()
+                await emit(text)
+        except Exception as e:
+            # Deliver whatever arrived before the failure ahead of the error
+            if buffer:
+                await emit(''.join(buffer))
+            await emit(f"\nError: Failed to get streaming completion from API. {str(e)}")
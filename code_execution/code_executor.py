@@ -5,85 +5,151 @@ This module provides a sandboxed environment for executing Python code.
 """
 
 import io
-import sys
-import ast
-import signal
+import builtins
+import marshal
 import traceback
+import signal
 import contextlib
+import multiprocessing
+from hashlib import blake2b
+from collections import OrderedDict
 from typing import Tuple
 
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; the wall-clock timeout still applies
+    resource = None
+
+# Builtins that user code is not allowed to access
+_BLOCKED_BUILTINS = ('open', 'exec', 'eval', 'compile', '__import__')
+
+# Restricted builtins, built once at import. Each execution runs in its own
+# child process, so user code cannot leak changes to this dict between runs.
+_SAFE_BUILTINS = {
+    name: getattr(builtins, name)
+    for name in dir(builtins)
+    if name not in _BLOCKED_BUILTINS
+}
+
+# Children are started from a clean server process (or spawned where fork
+# servers are unavailable) rather than forked from the caller, since forking
+# a threaded web server can deadlock on locks held by other threads
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# Exit signals that mean the child ran out of time (CPU limit or termination)
+_TIMEOUT_SIGNALS = frozenset(
+    -getattr(signal, name) for name in ("SIGXCPU", "SIGKILL") if hasattr(signal, name)
+)
+
+def _run_compiled(code_bytes: bytes, timeout: int, conn) -> None:
+    """
+    Execute marshalled code in a child process and send back the result.
+    
+    Args:
+        code_bytes: Marshalled code object to execute
+        timeout: CPU time limit in seconds
+        conn: Pipe connection used to send (output, error, success) back
+    """
+    if resource is not None:
+        try:
+            resource.setrlimit(resource.RLIMIT_CPU, (timeout, timeout))
+        except (ValueError, OSError):
+            pass
+    
+    # Capture stdout and stderr
+    stdout_capture = io.StringIO()
+    stderr_capture = io.StringIO()
+    
+    # Prepare restricted globals
+    restricted_globals = {"__builtins__": _SAFE_BUILTINS}
+    
+    success = True
+    
+    try:
+        with contextlib.redirect_stdout(stdout_capture):
+            with contextlib.redirect_stderr(stderr_capture):
+                exec(marshal.loads(code_bytes), restricted_globals)
+        error = stderr_capture.getvalue()
+    except BaseException as e:
+        success = False
+        error = f"Error: {str(e)}\n{traceback.format_exc()}"
+    
+    conn.send((stdout_capture.getvalue(), error, success))
+    conn.close()
+
 class CodeExecutor:
     """Provides a sandboxed environment for executing Python code."""
     
+    # Maximum number of compiled snippets kept in memory
+    CODE_CACHE_SIZE = 128
+    
     def __init__(self, timeout: int = 5):
         """Initialize code executor with specified timeout."""
         self.timeout = timeout
-        # Check if we're on Windows
-        self.is_windows = sys.platform.startswith('win')
+        # Compiled (marshalled) code keyed by a digest of the source, so
+        # repeated executions of the same snippet skip parsing and compilation
+        self._code_cache: "OrderedDict[bytes, bytes]" = OrderedDict()
     
     def execute_code(self, code: str) -> Tuple[str, str, bool]:
         """
-        Execute Python code in a sandboxed environment.
+        Execute Python code in a sandboxed child process.
         
         Returns:
             Tuple containing (output, error_message, success_flag)
         """
-        # Capture stdout and stderr
-        stdout_capture = io.StringIO()
-        stderr_capture = io.StringIO()
-        
-        # Prepare restricted globals
-        restricted_globals = {
-            "__builtins__": {
-                name: getattr(__builtins__, name)
-                for name in dir(__builtins__)
-                if name not in ['open', 'exec', 'eval', 'compile', '__import__']
-            }
-        }
+        # Compile once; syntax errors are reported without starting a process
+        try:
+            code_bytes = self._compile(code)
+        except SyntaxError as e:
+            return "", f"Syntax Error: {str(e)}", False
         
-        success = True
+        parent_conn, child_conn = _MP_CONTEXT.Pipe(duplex=False)
+        process = _MP_CONTEXT.Process(
+            target=_run_compiled,
+            args=(code_bytes, self.timeout, child_conn),
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
         
+        timeout_error = f"Execution Timeout: Code took too long to run (> {self.timeout}s)"
+        result = None
         try:
-            # Validate syntax first
-            ast.parse(code)
-            
-            if self.is_windows:
-                # Windows doesn't support SIGALRM, use a different approach
-                # Execute code with captured output
-                with contextlib.redirect_stdout(stdout_capture):
-                    with contextlib.redirect_stderr(stderr_capture):
-                        exec(code, restricted_globals)
+            if parent_conn.poll(self.timeout):
+                result = parent_conn.recv()
             else:
-                # Set up timeout handler for Unix systems
-                def timeout_handler(signum, frame):
-                    raise TimeoutError("Code execution timed out")
-                
-                # Set timeout
-                signal.signal(signal.SIGALRM, timeout_handler)
-                signal.alarm(self.timeout)
-                
-                # Execute code with captured output
-                with contextlib.redirect_stdout(stdout_capture):
-                    with contextlib.redirect_stderr(stderr_capture):
-                        exec(code, restricted_globals)
-                
-                # Reset alarm
-                signal.alarm(0)
-            
-            output = stdout_capture.getvalue()
-            error = stderr_capture.getvalue()
-            
-        except SyntaxError as e:
-            success = False
-            output = ""
-            error = f"Syntax Error: {str(e)}"
-        except TimeoutError as e:
-            success = False
-            output = stdout_capture.getvalue()
-            error = f"Execution Timeout: Code took too long to run (> {self.timeout}s)"
-        except Exception as e:
-            success = False
-            output = stdout_capture.getvalue()
-            error = f"Error: {str(e)}\n{traceback.format_exc()}"
+                result = "", timeout_error, False
+        except EOFError:
+            # The child exited without reporting; its exit code says why
+            pass
+        finally:
+            parent_conn.close()
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        
+        if result is None:
+            if process.exitcode in _TIMEOUT_SIGNALS:
+                # Killed by the CPU time limit
+                result = "", timeout_error, False
+            else:
+                result = "", f"Execution Error: Process exited unexpectedly (exit code {process.exitcode})", False
+        return result
+    
+    def _compile(self, code: str) -> bytes:
+        """Return marshalled code for a snippet, compiling it on a cache miss."""
+        cache = self._code_cache
+        key = blake2b(code.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        code_bytes = cache.get(key)
+        if code_bytes is not None:
+            cache.move_to_end(key)
+            return code_bytes
         
-        return output, error, success
+        code_bytes = marshal.dumps(compile(code, '<user>', 'exec'))
+        cache[key] = code_bytes
+        if len(cache) > self.CODE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return code_bytes
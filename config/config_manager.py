@@ -5,8 +5,21 @@ This module handles configuration settings for the chatbot with secure storage o
 """
 
 import os
+import copy
+import logging
 import configparser
-from typing import Dict, Any
+from typing import Dict, Any, Tuple, Callable
+
+def _parse_bool(value: Any) -> bool:
+    """Parse a boolean config value the same way configparser does."""
+    if isinstance(value, bool):
+        return value
+    try:
+        return configparser.ConfigParser.BOOLEAN_STATES[str(value).strip().lower()]
+    except KeyError:
+        raise ValueError(f"Not a boolean: {value!r}")
+
+logger = logging.getLogger(__name__)
 
 class ConfigManager:
     """Manages configuration settings for the chatbot with secure storage options."""
@@ -31,22 +44,44 @@ class ConfigManager:
             "primary_color": "cyan",
             "secondary_color": "green",
             "error_color": "red",
-            "success_color": "magenta"
+            "success_color": "magenta",
+            "thinking_delay_ms": 0
         }
     }
     
+    # Value types for non-string options, derived from the defaults, so
+    # values read back from the file as strings are returned typed
+    _SCHEMA = {
+        (section, key): _parse_bool if isinstance(value, bool) else type(value)
+        for section, options in DEFAULT_CONFIG.items()
+        for key, value in options.items()
+        if not isinstance(value, str)
+    }
+    
+    # Parsed config files shared across instances: path -> ((mtime_ns, size), config)
+    _FILE_CACHE: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+    
     def __init__(self, config_file: str = "config.ini"):
         """Initialize configuration manager with specified config file."""
         self.config_file = config_file
         self.config = self._load_config()
+        self._build_snapshot()
+        # Callbacks run after every save, so components can rebind settings
+        self._save_listeners = []
     
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from file or create default if not exists."""
         if os.path.exists(self.config_file):
             try:
-                config = configparser.ConfigParser()
-                config.read(self.config_file)
-                return {section: dict(config[section]) for section in config.sections()}
+                path = os.path.abspath(self.config_file)
+                stamp = self._file_stamp(path)
+                cached = self._FILE_CACHE.get(path)
+                if cached is None or cached[0] != stamp:
+                    config = configparser.ConfigParser()
+                    config.read(self.config_file)
+                    cached = (stamp, {section: dict(config[section]) for section in config.sections()})
+                    self._FILE_CACHE[path] = cached
+                return self._with_defaults(cached[1])
             except Exception as e:
                 print(f"Error loading config: {e}")
                 return self._create_default_config()
@@ -55,33 +90,60 @@ class ConfigManager:
     
     def _create_default_config(self) -> Dict[str, Any]:
         """Create and save default configuration."""
-        config = configparser.ConfigParser()
-        
-        for section, options in self.DEFAULT_CONFIG.items():
-            config[section] = {}
+        self._write_config(self.DEFAULT_CONFIG)
+        return copy.deepcopy(self.DEFAULT_CONFIG)
+    
+    def _with_defaults(self, parsed: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Overlay parsed file values on top of the default configuration."""
+        config = copy.deepcopy(self.DEFAULT_CONFIG)
+        for section, options in parsed.items():
+            config.setdefault(section, {}).update(options)
+        return config
+    
+    def _build_snapshot(self) -> None:
+        """Flatten the configuration into typed (section, key) -> value lookups."""
+        self._flat = {}
+        for section, options in self.config.items():
             for key, value in options.items():
-                # Ensure all config values are ASCII-compatible for Windows
-                if isinstance(value, str):
-                    # Replace or remove non-ASCII characters
-                    value = value.encode('ascii', 'replace').decode('ascii')
-                config[section][key] = str(value)
-        
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                config.write(f)
-        except UnicodeEncodeError:
-            # Fallback to ASCII encoding if UTF-8 fails
-            with open(self.config_file, 'w', encoding='ascii', errors='replace') as f:
-                config.write(f)
-        
-        return self.DEFAULT_CONFIG
+                cast = self._SCHEMA.get((section, key))
+                if cast is None:
+                    self._flat[(section, key)] = value
+                    continue
+                try:
+                    self._flat[(section, key)] = cast(value)
+                except (TypeError, ValueError):
+                    # A bad line in the file must not stop the app; get()
+                    # falls back to the caller's default for this option
+                    logger.warning("Ignoring invalid value for '%s' in section [%s]: %r",
+                                   key, section, value)
     
     def get(self, section: str, key: str, default: Any = None) -> Any:
-        """Get configuration value with fallback to default."""
-        try:
-            return self.config.get(section, {}).get(key, default)
-        except:
-            return default
+        """
+        Get configuration value, coerced to its declared type, with fallback to default.
+        
+        Values are served from a snapshot taken at load time; edits made
+        directly to self.config become visible after save(). Options whose
+        value cannot be coerced return the default.
+        """
+        return self._flat.get((section, key), default)
+    
+    def set(self, section: str, key: str, value: Any) -> None:
+        """
+        Set a configuration value, validating it against the option's declared type.
+        
+        Raises:
+            ValueError: If the value cannot be coerced to the option's type
+        """
+        cast = self._SCHEMA.get((section, key))
+        if cast is not None:
+            try:
+                typed = cast(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for '{key}' in section [{section}]: {value!r}")
+        else:
+            typed = value
+        self.config.setdefault(section, {})[key] = value
+        self._flat[(section, key)] = typed
     
     def get_api_key(self) -> str:
         """Securely retrieve API key from environment variable."""
@@ -96,13 +158,25 @@ class ConfigManager:
     
     def save(self) -> None:
         """Save current configuration to file."""
+        self._write_config(self.config)
+        self._build_snapshot()
+        for listener in self._save_listeners:
+            listener()
+    
+    def add_save_listener(self, listener: Callable[[], None]) -> None:
+        """Register a callback to run after the configuration is saved."""
+        self._save_listeners.append(listener)
+    
+    def _write_config(self, sections: Dict[str, Dict[str, Any]]) -> None:
+        """Write configuration sections to file and refresh the parse cache."""
         config = configparser.ConfigParser()
         
-        for section, options in self.config.items():
+        for section, options in sections.items():
             config[section] = {}
             for key, value in options.items():
                 # Ensure all config values are ASCII-compatible for Windows
-                if isinstance(value, str):
+                # (most values already are, so skip the codec round trip)
+                if isinstance(value, str) and not value.isascii():
                     # Replace or remove non-ASCII characters
                     value = value.encode('ascii', 'replace').decode('ascii')
                 config[section][key] = str(value)
@@ -114,3 +188,16 @@ class ConfigManager:
             # Fallback to ASCII encoding if UTF-8 fails
             with open(self.config_file, 'w', encoding='ascii', errors='replace') as f:
                 config.write(f)
+        
+        # Record what a re-read would produce so the next load skips parsing
+        path = os.path.abspath(self.config_file)
+        self._FILE_CACHE[path] = (
+            self._file_stamp(path),
+            {section: dict(config[section]) for section in config.sections()}
+        )
+    
+    @staticmethod
+    def _file_stamp(path: str) -> Tuple[int, int]:
+        """Return the modification time and size used to validate cached parses."""
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
@@ -7,30 +7,186 @@ sophisticated context tracking, relevance scoring, and memory optimization.
 
 import re
 from typing import List, Dict, Any, Optional, Tuple
-from collections import deque
-import json
+from collections import deque, OrderedDict
+import sqlite3
 import datetime
+import threading
+import functools
+from hashlib import blake2b
+from utils.json_utils import json_dumps, json_loads
+
+# Try importing optional dependencies with fallbacks
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Tokenizer encoding used for token counts when tiktoken is available
+_TOKEN_ENCODING = "cl100k_base"
+
+@functools.lru_cache(maxsize=None)
+def _load_encoding():
+    """Load the tiktoken encoding once per process, or None if it is unavailable."""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.get_encoding(_TOKEN_ENCODING)
+    except Exception:
+        # The encoding file may need to be downloaded; fall back offline
+        return None
+
+# Patterns for code-related keywords (function, class, import names, etc.).
+# Each pattern is scanned separately: matches of different patterns may
+# overlap, e.g. an ALL_CAPS constant on an assignment line is both a
+# keyword and an entity.
+_CODE_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'def\s+(\w+)',  # Function names
+    r'class\s+(\w+)',  # Class names
+    r'import\s+(\w+)',  # Import names
+    r'from\s+(\w+)',  # From import
+    r'(\w+)\s*=',  # Variable assignments
+    r'(\w+)\(',  # Function calls
+))
+
+# Patterns for potential entities (simplified; in production, use NER)
+_ENTITY_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)',  # Proper names
+    r'([A-Z][A-Z0-9_]+)',  # ALL_CAPS constants
+    r'"([^"]+)"',  # Quoted strings
+    r"'([^']+)'",  # Single-quoted strings
+))
+
+_WORD_RE = re.compile(r'\b\w{4,}\b')
+_STOP_WORDS = frozenset(['this', 'that', 'with', 'from', 'have', 'what'])
+# Fenced code block; group 1 is set for python fences, group 2 is the body
+_CODE_BLOCK_RE = re.compile(r'```(python)?(.*?)```', re.DOTALL)
+_INDENT_RE = re.compile(r'^\s{4}')
+
+# Keywords that identify each conversation topic
+_TOPIC_KEYWORDS = {
+    "code_help": ["help", "error", "bug", "fix", "problem", "issue", "debug"],
+    "explanation": ["explain", "understand", "mean", "concept", "how", "why"],
+    "code_generation": ["create", "generate", "write", "implement", "code", "function", "class"],
+    "data_analysis": ["data", "analyze", "plot", "graph", "pandas", "dataframe"],
+    "web_dev": ["web", "html", "css", "javascript", "flask", "django"],
+    "machine_learning": ["model", "train", "predict", "ml", "ai", "neural", "learn"],
+    "database": ["database", "sql", "query", "table", "join", "select"],
+    "file_io": ["file", "read", "write", "open", "save", "load"],
+}
+_TOPIC_KW_SETS = {topic: frozenset(kws) for topic, kws in _TOPIC_KEYWORDS.items()}
+
+# Schema of the optional on-disk message store used for session resume
+_DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    topic TEXT,
+    keywords BLOB,
+    entities BLOB,
+    code_snippets BLOB,
+    importance REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_imp ON messages(importance);
+"""
+
+def _snippet_key(snippet: str) -> bytes:
+    """Return a stable digest of a code snippet for code_references keys."""
+    return blake2b(snippet.encode('utf-8'), digest_size=16).digest()
+
+# Number of message contents whose extracted code snippets are cached
+_CODE_CACHE_SIZE = 256
+
+# Keyword/entity vocabulary size above which the bitset vocabulary is rebuilt
+_MAX_VOCAB_SIZE = 4096
+
+try:
+    _popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def _popcount(value: int) -> int:
+        return bin(value).count("1")
 
 class AdvancedContextManager:
     """Advanced conversation context management with sophisticated tracking and optimization."""
     
-    def __init__(self, max_context_length: int = 4000, max_messages: int = 20):
+    def __init__(self, max_context_length: int = 4000, max_messages: int = 20,
+                 db_path: Optional[str] = None):
         """
         Initialize the advanced context manager.
         
         Args:
             max_context_length: Maximum total context length in tokens (approximate)
             max_messages: Maximum number of messages to retain
+            db_path: Optional SQLite file that stores every message so a
+                later session can resume without re-processing history
         """
         self.max_context_length = max_context_length
         self.max_messages = max_messages
-        self.messages = []
-        self.message_importance = {}  # Maps message index to importance score
-        self.topics = {}  # Topic tracking
+        self._encoding = _load_encoding()
+        self._content_code_cache = OrderedDict()  # content -> extracted code snippets (LRU)
+        self._init_state()
+        
+        self._db = None
+        # The connection is shared across web worker threads, so every use
+        # of it is serialized through this lock
+        self._db_lock = threading.Lock()
+        if db_path is not None:
+            self._db = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_DB_SCHEMA)
+            self._resume_from_db()
+    
+    def _init_state(self):
+        """Set up empty conversation state and indexes."""
+        # Messages and their parallel arrays are deques so the oldest message
+        # can be evicted in O(1) on simple overflow
+        self.messages = deque()
+        # Importance scores stored as a parallel array aligned with self.messages
+        self._importance = deque()
+        self._next_id = 0  # Message ids are never reused, even after pruning
+        # Keywords/entities interned to bit positions; each message's sets are
+        # stored as int bitsets aligned with self.messages
+        self._vocab = {}
+        self._vocab_limit = _MAX_VOCAB_SIZE  # Vocabulary size that triggers a rebuild
+        self._kw_bits = deque()
+        self._ent_bits = deque()
+        self.topics = {}  # Topic tracking (topic -> message ids)
+        self._role_index = {"user": deque(), "assistant": deque(), "system": deque()}  # role -> message ids
+        self._term_index = {}  # keyword/entity -> message ids
+        self._positions = {}  # message id -> position in self.messages, plus _evicted
+        self._evicted = 0  # Messages evicted from the front since positions were rebuilt
         self.current_topic = None
-        self.code_references = {}  # Track code references across conversation
+        # Track code references across conversation (snippet digest -> message id),
+        # bounded to the most recently referenced snippets
+        self.code_references = OrderedDict()
+        self._total_tokens = 0  # Running token count of retained messages
         self.last_optimization = datetime.datetime.now()
     
+    def reset(self):
+        """
+        Clear the conversation in place.
+        
+        The tokenizer and the extracted-code cache are kept, since they do not
+        depend on the conversation. Stored messages are deleted as well, so a
+        later session does not resume the cleared conversation.
+        """
+        next_id = self._next_id
+        self._init_state()
+        self._next_id = next_id
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM messages")
+    
+    def close(self):
+        """Close the on-disk message store, if one is open."""
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+                self._db = None
+    
     def add_message(self, role: str, content: str) -> int:
         """
         Add a message to the conversation context with advanced processing.
@@ -40,10 +196,15 @@ class AdvancedContextManager:
             content: Message content
             
         Returns:
-            Index of the added message
+            Id of the added message
         """
+        return self._append_parsed(role, content, self._cached_extract_code(content))
+    
+    def _append_parsed(self, role: str, content: str, code_snippets: List[str]) -> int:
+        """Add a message whose code snippets have already been extracted."""
         # Create message object with metadata
-        message_id = len(self.messages)
+        message_id = self._next_id
+        self._next_id += 1
         timestamp = datetime.datetime.now().isoformat()
         
         message = {
@@ -59,15 +220,13 @@ class AdvancedContextManager:
         message["entities"] = entities
         message["keywords"] = keywords
         
-        # Extract code if present
-        code_snippets = self._extract_code(content)
+        # Record extracted code
         if code_snippets:
             message["code_snippets"] = code_snippets
             
             # Update code references
             for snippet in code_snippets:
-                snippet_hash = hash(snippet)
-                self.code_references[snippet_hash] = message_id
+                self._add_code_reference(snippet, message_id)
         
         # Detect topic
         detected_topic = self._detect_topic(content, keywords)
@@ -77,23 +236,113 @@ class AdvancedContextManager:
         if role == "user":
             self.current_topic = detected_topic
         
-        # Update topic tracking
-        if detected_topic not in self.topics:
-            self.topics[detected_topic] = []
-        self.topics[detected_topic].append(message_id)
-        
         # Calculate initial importance score
-        importance = self._calculate_importance(message, role)
-        self.message_importance[message_id] = importance
+        importance = self._calculate_importance(message, role, len(self.messages))
         
         # Add message to conversation
-        self.messages.append(message)
+        self._append_message(message, importance)
+        if self._db is not None:
+            self._store_message(message, importance)
         
         # Optimize context if needed
         self._optimize_context_if_needed()
         
         return message_id
     
+    def _append_message(self, message: Dict[str, Any], importance: float):
+        """Append a processed message and update the topic, role and term indexes."""
+        message_id = message["id"]
+        self.topics.setdefault(message["topic"], deque()).append(message_id)
+        self._positions[message_id] = len(self.messages) + self._evicted
+        self._role_index.setdefault(message["role"], deque()).append(message_id)
+        for term in set(message["keywords"]).union(message["entities"]):
+            self._term_index.setdefault(term, deque()).append(message_id)
+        self.messages.append(message)
+        self._importance.append(importance)
+        self._kw_bits.append(self._intern_bits(message["keywords"]))
+        self._ent_bits.append(self._intern_bits(message["entities"]))
+        self._total_tokens += message["tokens"]
+    
+    def _add_code_reference(self, snippet: str, message_id: int):
+        """Record the message a snippet appeared in, evicting the oldest reference when full."""
+        references = self.code_references
+        snippet_hash = _snippet_key(snippet)
+        references[snippet_hash] = message_id
+        references.move_to_end(snippet_hash)
+        if len(references) > self.max_messages * 4:
+            references.popitem(last=False)
+    
+    def _store_message(self, message: Dict[str, Any], importance: float):
+        """Write a message to the on-disk store."""
+        code_snippets = message.get("code_snippets")
+        with self._db_lock:
+            self._db.execute(
+                "INSERT INTO messages (id, role, content, timestamp, tokens, topic,"
+                " keywords, entities, code_snippets, importance)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (message["id"], message["role"], message["content"], message["timestamp"],
+                 message["tokens"], message["topic"],
+                 json_dumps(message["keywords"]),
+                 json_dumps(message["entities"]),
+                 json_dumps(code_snippets) if code_snippets else None,
+                 importance)
+            )
+    
+    def _delete_stored(self, message_ids: List[int]):
+        """Remove messages that left the retained context from the on-disk store."""
+        if self._db is None or not message_ids:
+            return
+        with self._db_lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany("DELETE FROM messages WHERE id = ?",
+                                     ((message_id,) for message_id in message_ids))
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+    
+    def _resume_from_db(self):
+        """Restore the retained context from the on-disk store."""
+        db = self._db
+        row = db.execute("SELECT MAX(id) FROM messages").fetchone()
+        if row[0] is None:
+            return
+        self._next_id = row[0] + 1
+        
+        # Reload system messages and the most recent messages; messages that
+        # leave the retained context are deleted from the store as they go
+        rows = db.execute(
+            "SELECT id, role, content, timestamp, tokens, topic, keywords,"
+            " entities, code_snippets, importance FROM messages"
+            " WHERE role = 'system' OR id IN"
+            " (SELECT id FROM messages WHERE role != 'system' ORDER BY id DESC LIMIT ?)"
+            " ORDER BY id",
+            (self.max_messages,)
+        ).fetchall()
+        
+        for (message_id, role, content, timestamp, tokens, topic,
+             keywords, entities, code_snippets, importance) in rows:
+            message = {
+                "id": message_id,
+                "role": role,
+                "content": content,
+                "timestamp": timestamp,
+                "tokens": tokens,
+                "entities": json_loads(entities),
+                "keywords": json_loads(keywords),
+                "topic": topic
+            }
+            if code_snippets is not None:
+                message["code_snippets"] = json_loads(code_snippets)
+                for snippet in message["code_snippets"]:
+                    self._add_code_reference(snippet, message_id)
+            if role == "user":
+                self.current_topic = topic
+            self._append_message(message, importance)
+        
+        self._optimize_context_if_needed()
+    
     def get_optimized_context(self, max_length: Optional[int] = None) -> List[Dict[str, str]]:
         """
         Get optimized conversation context for API requests.
@@ -107,52 +356,48 @@ class AdvancedContextManager:
         if max_length is None:
             max_length = self.max_context_length
         
+        messages = self.messages
+        
         # Always include system message if present
-        context = []
-        system_messages = [m for m in self.messages if m["role"] == "system"]
-        if system_messages:
-            context.extend(system_messages)
+        selected = self._positions_of(self._role_index["system"])
         
         # Get remaining context budget
-        used_tokens = sum(m["tokens"] for m in context)
+        used_tokens = sum(messages[i]["tokens"] for i in selected)
         remaining_tokens = max_length - used_tokens
         
-        # Get non-system messages sorted by importance
-        regular_messages = [m for m in self.messages if m["role"] != "system"]
+        # Get positions of non-system messages
+        system_positions = set(selected)
+        regular = [i for i in range(len(messages)) if i not in system_positions]
         
         # Always include the most recent messages
-        recent_count = min(4, len(regular_messages))
-        recent_messages = regular_messages[-recent_count:]
-        regular_messages = regular_messages[:-recent_count]
+        split = len(regular) - min(4, len(regular))
         
         # Add recent messages to context
-        for msg in recent_messages:
-            context.append(msg)
-            used_tokens += msg["tokens"]
+        for i in regular[split:]:
+            selected.append(i)
+            used_tokens += messages[i]["tokens"]
             remaining_tokens = max_length - used_tokens
         
-        # Sort remaining messages by importance
-        sorted_messages = sorted(
-            regular_messages,
-            key=lambda m: self.message_importance.get(m["id"], 0),
-            reverse=True
-        )
+        # Sort remaining positions by importance
+        candidates = regular[:split]
+        candidates.sort(key=self._importance.__getitem__, reverse=True)
         
         # Add important messages until we reach the limit
-        for msg in sorted_messages:
-            if msg["tokens"] <= remaining_tokens:
-                context.append(msg)
-                used_tokens += msg["tokens"]
+        for i in candidates:
+            tokens = messages[i]["tokens"]
+            if tokens <= remaining_tokens:
+                selected.append(i)
+                used_tokens += tokens
                 remaining_tokens = max_length - used_tokens
             
             if remaining_tokens <= 0:
                 break
         
-        # Sort messages by original order
-        context.sort(key=lambda m: m["id"])
+        # Restore original order
+        selected.sort()
         
         # Convert to simple format for API
-        return [{"role": m["role"], "content": m["content"]} for m in context]
+        return [{"role": messages[i]["role"], "content": messages[i]["content"]} for i in selected]
     
     def get_relevant_context(self, query: str, max_messages: int = 5) -> List[Dict[str, str]]:
         """
@@ -168,37 +413,41 @@ class AdvancedContextManager:
         # Extract entities and keywords from query
         query_entities, query_keywords = self._extract_entities_and_keywords(query)
         
+        query_topic = self._detect_topic(query, query_keywords)
+        query_kw_bits = self._lookup_bits(query_keywords)
+        query_ent_bits = self._lookup_bits(query_entities)
+        
+        # Only score messages that share the query topic or a keyword/entity.
+        # Any other message scores on recency alone, so the most recent
+        # max_messages of them are the only ones that can still make the cut.
+        total = len(self.messages)
+        candidates = set(self._positions_of(self.topics.get(query_topic, [])))
+        for term in set(query_keywords).union(query_entities):
+            candidates.update(self._positions_of(self._term_index.get(term, [])))
+        candidates.update(range(max(0, total - max_messages), total))
+        
         # Score messages by relevance to query
         relevance_scores = {}
         
-        for msg in self.messages:
-            score = 0
-            
-            # Score based on keyword overlap
-            msg_keywords = set(msg.get("keywords", []))
-            keyword_overlap = msg_keywords.intersection(query_keywords)
-            score += len(keyword_overlap) * 2
-            
-            # Score based on entity overlap
-            msg_entities = set(msg.get("entities", []))
-            entity_overlap = msg_entities.intersection(query_entities)
-            score += len(entity_overlap) * 3
+        for position in candidates:
+            msg = self.messages[position]
+            # Score based on keyword and entity overlap
+            score = _popcount(self._kw_bits[position] & query_kw_bits) * 2
+            score += _popcount(self._ent_bits[position] & query_ent_bits) * 3
             
             # Score based on topic match
-            query_topic = self._detect_topic(query, query_keywords)
             if query_topic == msg.get("topic"):
                 score += 5
             
             # Score based on recency (newer is better)
-            msg_index = msg["id"]
-            recency_score = msg_index / len(self.messages)  # 0 to 1
+            recency_score = position / total  # 0 to 1
             score += recency_score * 2
             
-            relevance_scores[msg_index] = score
+            relevance_scores[position] = score
         
         # Get top relevant messages
-        top_indices = sorted(relevance_scores.keys(), 
-                            key=lambda idx: relevance_scores[idx],
+        top_indices = sorted(relevance_scores,
+                            key=relevance_scores.__getitem__,
                             reverse=True)[:max_messages]
         
         # Sort by original order
@@ -212,20 +461,35 @@ class AdvancedContextManager:
     
     def update_importance_scores(self):
         """Update importance scores for all messages based on current context."""
-        # Recalculate importance for all messages
-        for msg in self.messages:
-            msg_id = msg["id"]
-            role = msg["role"]
-            importance = self._calculate_importance(msg, role)
-            self.message_importance[msg_id] = importance
+        # Recalculate importance for all messages in one pass
+        calculate = self._calculate_importance
+        self._importance = deque(
+            calculate(msg, msg["role"], position)
+            for position, msg in enumerate(self.messages)
+        )
+        
+        if self._db is not None:
+            # One transaction for the batch instead of one commit per row
+            with self._db_lock:
+                self._db.execute("BEGIN")
+                try:
+                    self._db.executemany(
+                        "UPDATE messages SET importance = ? WHERE id = ?",
+                        zip(self._importance, (msg["id"] for msg in self.messages))
+                    )
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+                self._db.execute("COMMIT")
     
-    def _calculate_importance(self, message: Dict[str, Any], role: str) -> float:
+    def _calculate_importance(self, message: Dict[str, Any], role: str, position: int) -> float:
         """
         Calculate importance score for a message.
         
         Args:
             message: Message dictionary
             role: Message role
+            position: Position of the message in the conversation
             
         Returns:
             Importance score (higher is more important)
@@ -237,7 +501,7 @@ class AdvancedContextManager:
             return 100
         
         # Recent messages are important
-        recency = message["id"] / max(1, len(self.messages))
+        recency = position / max(1, len(self.messages))
         score += recency * 20  # 0-20 points for recency
         
         # Messages with code are important
@@ -266,12 +530,19 @@ class AdvancedContextManager:
         """Check if context optimization is needed and perform if necessary."""
         # Check if we've exceeded max messages
         if len(self.messages) > self.max_messages:
+            # Simple overflow: drop the oldest message unless it is a system
+            # or code message, and only run the full optimization if the
+            # token budget is still exceeded
+            oldest = self.messages[0]
+            if oldest["role"] != "system" and "code_snippets" not in oldest:
+                self._evict_oldest()
+                if self._total_tokens <= self.max_context_length:
+                    return
             self._optimize_context()
             return
         
         # Check if we've exceeded max context length
-        total_tokens = sum(m.get("tokens", 0) for m in self.messages)
-        if total_tokens > self.max_context_length:
+        if self._total_tokens > self.max_context_length:
             self._optimize_context()
             return
         
@@ -287,53 +558,149 @@ class AdvancedContextManager:
         # Update importance scores
         self.update_importance_scores()
         
-        # Always keep system messages
-        system_messages = [m for m in self.messages if m["role"] == "system"]
+        messages = self.messages
+        importance = self._importance
         
-        # Always keep the most recent messages (last 2 turns)
-        recent_count = min(4, len(self.messages))
-        recent_messages = self.messages[-recent_count:]
+        # Always keep the most recent messages (last 2 turns) and all system messages
+        recent_start = max(0, len(messages) - 4)
+        kept = [i for i in range(recent_start) if messages[i]["role"] == "system"]
+        kept.extend(range(recent_start, len(messages)))
+        kept_tokens = sum(messages[i].get("tokens", 0) for i in kept)
         
-        # Get remaining messages
-        middle_messages = [m for m in self.messages 
-                          if m["role"] != "system" and m not in recent_messages]
-        
-        # Sort by importance
-        middle_messages.sort(key=lambda m: self.message_importance.get(m["id"], 0), reverse=True)
-        
-        # Keep most important messages within token budget
-        kept_messages = system_messages + recent_messages
-        kept_tokens = sum(m.get("tokens", 0) for m in kept_messages)
-        
-        # Calculate how many more tokens we can include
-        remaining_tokens = self.max_context_length - kept_tokens
+        # Get remaining positions, sorted by importance
+        middle = [i for i in range(recent_start) if messages[i]["role"] != "system"]
+        middle.sort(key=importance.__getitem__, reverse=True)
         
         # Add important messages until we reach the limit
-        for msg in middle_messages:
-            msg_tokens = msg.get("tokens", 0)
+        for i in middle:
+            if len(kept) >= self.max_messages:
+                break
+            
+            msg_tokens = messages[i].get("tokens", 0)
             if kept_tokens + msg_tokens <= self.max_context_length:
-                kept_messages.append(msg)
+                kept.append(i)
                 kept_tokens += msg_tokens
-            
-            if len(kept_messages) >= self.max_messages:
-                break
         
-        # Sort by original order
-        kept_messages.sort(key=lambda m: m["id"])
+        # Restore original order
+        kept.sort()
+        
+        # Dropped messages are removed from the on-disk store as well
+        kept_set = set(kept)
+        self._delete_stored([messages[i]["id"] for i in range(len(messages)) if i not in kept_set])
+        
+        # Update messages and the parallel per-message arrays
+        self.messages = deque(messages[i] for i in kept)
+        self._importance = deque(importance[i] for i in kept)
+        self._kw_bits = deque(self._kw_bits[i] for i in kept)
+        self._ent_bits = deque(self._ent_bits[i] for i in kept)
+        self._total_tokens = kept_tokens
+        self._positions = {m["id"]: i for i, m in enumerate(self.messages)}
+        self._evicted = 0
+        for role, ids in self._role_index.items():
+            self._role_index[role] = deque(i for i in ids if i in self._positions)
+        self._term_index = {
+            term: kept_ids
+            for term, ids in self._term_index.items()
+            if (kept_ids := deque(i for i in ids if i in self._positions))
+        }
+        self.topics = {
+            topic: kept_ids
+            for topic, ids in self.topics.items()
+            if (kept_ids := deque(i for i in ids if i in self._positions))
+        }
+        self.code_references = OrderedDict(
+            (snippet_hash, message_id)
+            for snippet_hash, message_id in self.code_references.items()
+            if message_id in self._positions
+        )
         
-        # Update messages list
-        self.messages = kept_messages
+        self._prune_vocab_if_needed()
         
         # Update last optimization timestamp
         self.last_optimization = datetime.datetime.now()
     
+    def _evict_oldest(self):
+        """Drop the oldest retained message and its index entries in O(1)."""
+        message = self.messages.popleft()
+        self._importance.popleft()
+        self._kw_bits.popleft()
+        self._ent_bits.popleft()
+        self._total_tokens -= message["tokens"]
+        
+        message_id = message["id"]
+        del self._positions[message_id]
+        self._evicted += 1
+        self._delete_stored([message_id])
+        
+        # Ids are appended in order, so the oldest message is at the front
+        # of every index list that contains it
+        ids = self._role_index.get(message["role"])
+        if ids and ids[0] == message_id:
+            ids.popleft()
+        topic = message["topic"]
+        ids = self.topics.get(topic)
+        if ids and ids[0] == message_id:
+            ids.popleft()
+            if not ids:
+                del self.topics[topic]
+        for term in set(message["keywords"]).union(message["entities"]):
+            ids = self._term_index.get(term)
+            if ids and ids[0] == message_id:
+                ids.popleft()
+                if not ids:
+                    del self._term_index[term]
+        
+        self._prune_vocab_if_needed()
+    
+    def _positions_of(self, message_ids: List[int]) -> List[int]:
+        """Map message ids to positions, skipping messages that were pruned."""
+        positions = self._positions
+        evicted = self._evicted
+        return [positions[i] - evicted for i in message_ids if i in positions]
+    
+    def _intern_bits(self, terms: List[str]) -> int:
+        """Intern terms into the vocabulary and return their bitset."""
+        vocab = self._vocab
+        bits = 0
+        for term in terms:
+            bits |= 1 << vocab.setdefault(term, len(vocab))
+        return bits
+    
+    def _lookup_bits(self, terms: List[str]) -> int:
+        """Return the bitset of already-interned terms (unknown terms are ignored)."""
+        vocab = self._vocab
+        bits = 0
+        for term in terms:
+            bit = vocab.get(term)
+            if bit is not None:
+                bits |= 1 << bit
+        return bits
+    
+    def _prune_vocab_if_needed(self):
+        """Rebuild the vocabulary once terms of dropped messages have grown it past the limit."""
+        if len(self._vocab) > self._vocab_limit:
+            self._rebuild_vocab()
+    
+    def _rebuild_vocab(self):
+        """Rebuild the vocabulary from retained messages to keep bitsets narrow."""
+        self._vocab = {}
+        self._kw_bits = deque(self._intern_bits(m["keywords"]) for m in self.messages)
+        self._ent_bits = deque(self._intern_bits(m["entities"]) for m in self.messages)
+        # If the retained messages alone come close to the limit, raise it so
+        # rebuilds stay amortized instead of running on every eviction
+        self._vocab_limit = max(_MAX_VOCAB_SIZE, 2 * len(self._vocab))
+    
     def _estimate_tokens(self, text: str) -> int:
         """
         Estimate the number of tokens in a text.
         
-        This is a simple approximation. In production, you might want to use
-        a tokenizer from the LLM provider.
+        Uses tiktoken when installed. Otherwise this is a simple
+        approximation of ~4 characters per token. The count is computed
+        once per message and stored in message["tokens"].
         """
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        
         # Simple approximation: ~4 chars per token for English text
         return len(text) // 4 + 1
     
@@ -347,75 +714,74 @@ class AdvancedContextManager:
         # This is a simplified implementation
         # In production, consider using NLP libraries like spaCy
         
-        # Extract potential code-related terms
+        # Extract potential code-related terms and entities
+        # (in production, use NER from spaCy or similar for entities)
         code_keywords = set()
-        code_patterns = [
-            r'def\s+(\w+)',  # Function names
-            r'class\s+(\w+)',  # Class names
-            r'import\s+(\w+)',  # Import names
-            r'from\s+(\w+)',  # From import
-            r'(\w+)\s*=',  # Variable assignments
-            r'(\w+)\(',  # Function calls
-        ]
-        
-        for pattern in code_patterns:
-            matches = re.findall(pattern, text)
-            code_keywords.update(matches)
+        for pattern in _CODE_PATTERNS:
+            code_keywords.update(pattern.findall(text))
+        entities = set()
+        for pattern in _ENTITY_PATTERNS:
+            entities.update(pattern.findall(text))
         
         # Extract general keywords (simplified)
-        words = re.findall(r'\b\w{4,}\b', text.lower())
-        general_keywords = [w for w in words if w not in ['this', 'that', 'with', 'from', 'have', 'what']]
+        words = _WORD_RE.findall(text.lower())
+        general_keywords = [w for w in words if w not in _STOP_WORDS]
         
         # Combine and limit
         all_keywords = list(code_keywords) + general_keywords
         keywords = list(set(all_keywords))[:20]  # Limit to 20 unique keywords
         
-        # Extract potential entities (simplified)
-        # In production, use NER from spaCy or similar
-        entity_patterns = [
-            r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)',  # Proper names
-            r'([A-Z][A-Z0-9_]+)',  # ALL_CAPS constants
-            r'"([^"]+)"',  # Quoted strings
-            r"'([^']+)'",  # Single-quoted strings
-        ]
-        
-        entities = []
-        for pattern in entity_patterns:
-            matches = re.findall(pattern, text)
-            entities.extend(matches)
-        
-        entities = list(set(entities))[:10]  # Limit to 10 unique entities
+        entities = list(entities)[:10]  # Limit to 10 unique entities
         
         return entities, keywords
     
+    def _cached_extract_code(self, text: str) -> List[str]:
+        """Extract code snippets, reusing the result for previously seen text."""
+        cache = self._content_code_cache
+        code_snippets = cache.get(text)
+        if code_snippets is not None:
+            cache.move_to_end(text)
+            return code_snippets
+        
+        code_snippets = self._extract_code(text)
+        cache[text] = code_snippets
+        if len(cache) > _CODE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return code_snippets
+    
     def _extract_code(self, text: str) -> List[str]:
         """Extract code snippets from text."""
         # Look for markdown code blocks
-        code_blocks = re.findall(r'```(?:python)?(.*?)```', text, re.DOTALL)
+        code_blocks = [body for _, body in _CODE_BLOCK_RE.findall(text)]
         
         # If no markdown blocks, look for indented code
         if not code_blocks:
-            lines = text.split('\n')
-            code_lines = []
-            in_code_block = False
-            
-            for line in lines:
-                if re.match(r'^\s{4}', line) or line.startswith('\t'):
-                    in_code_block = True
-                    code_lines.append(line.strip())
-                elif in_code_block and line.strip() == '':
-                    code_lines.append('')
-                elif in_code_block:
-                    in_code_block = False
-                    if code_lines:
-                        code_blocks.append('\n'.join(code_lines))
-                        code_lines = []
-            
-            if code_lines:
-                code_blocks.append('\n'.join(code_lines))
+            code_blocks = self._extract_indented_code(text)
         
         return [block.strip() for block in code_blocks if block.strip()]
     
+    def _extract_indented_code(self, text: str) -> List[str]:
+        """Extract indented code blocks from text without markdown fences."""
+        code_blocks = []
+        code_lines = []
+        in_code_block = False
+        
+        for line in text.split('\n'):
+            if _INDENT_RE.match(line) or line.startswith('\t'):
+                in_code_block = True
+                code_lines.append(line.strip())
+            elif in_code_block and line.strip() == '':
+                code_lines.append('')
+            elif in_code_block:
+                in_code_block = False
+                if code_lines:
+                    code_blocks.append('\n'.join(code_lines))
+                    code_lines = []
+        
+        if code_lines:
+            code_blocks.append('\n'.join(code_lines))
+        return code_blocks
+    
     def _detect_topic(self, text: str, keywords: List[str]) -> str:
         """
         Detect the topic of a message.
@@ -427,35 +793,16 @@ class AdvancedContextManager:
         Returns:
             Detected topic
         """
-        # Define topic keywords
-        topic_keywords = {
-            "code_help": ["help", "error", "bug", "fix", "problem", "issue", "debug"],
-            "explanation": ["explain", "understand", "mean", "concept", "how", "why"],
-            "code_generation": ["create", "generate", "write", "implement", "code", "function", "class"],
-            "data_analysis": ["data", "analyze", "plot", "graph", "pandas", "dataframe"],
-            "web_dev": ["web", "html", "css", "javascript", "flask", "django"],
-            "machine_learning": ["model", "train", "predict", "ml", "ai", "neural", "learn"],
-            "database": ["database", "sql", "query", "table", "join", "select"],
-            "file_io": ["file", "read", "write", "open", "save", "load"],
-        }
-        
-        # Score each topic
-        topic_scores = {}
-        for topic, topic_kw in topic_keywords.items():
-            score = sum(1 for kw in keywords if kw in topic_kw)
-            
-            # Check for direct mentions in text
-            for kw in topic_kw:
-                if kw in text.lower():
-                    score += 0.5
-            
-            topic_scores[topic] = score
-        
-        # Get highest scoring topic
-        if topic_scores:
-            best_topic = max(topic_scores.items(), key=lambda x: x[1])
-            if best_topic[1] > 0:
-                return best_topic[0]
-        
-        # Default topic
-        return "general"
+        keyword_set = set(keywords)
+        text_lc = text.lower()
+        
+        # Score each topic (keyword hits plus half a point per direct
+        # mention) and track the highest scoring one; ties keep the first
+        best_topic, best_score = "general", 0.0
+        for topic, topic_kw in _TOPIC_KW_SETS.items():
+            score = len(topic_kw & keyword_set) + 0.5 * sum(1 for kw in topic_kw if kw in text_lc)
+            if score > best_score:
+                best_topic, best_score = topic, score
+        
+        # Falls back to the default topic when nothing scored
+        return best_topic
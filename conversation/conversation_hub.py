@@ -0,0 +1,64 @@
+"""
+Conversation Hub Module
+
+This module records messages in both the conversation history and the
+advanced context manager, parsing each message for code only once.
+"""
+
+from typing import List, Optional, Tuple
+from conversation.conversation_manager import ConversationManager, _CODE_RE
+from conversation.advanced_context_manager import AdvancedContextManager, _CODE_BLOCK_RE
+
+class ConversationHub:
+    """Keeps a ConversationManager and an AdvancedContextManager in step."""
+    
+    def __init__(self, conversation_manager: ConversationManager,
+                 advanced_context_manager: AdvancedContextManager):
+        """Initialize the hub with the managers it feeds."""
+        self.conversation_manager = conversation_manager
+        self.advanced_context_manager = advanced_context_manager
+    
+    def add_message(self, role: str, content: str) -> int:
+        """
+        Add a message to both managers.
+        
+        Args:
+            role: Message role (user/assistant)
+            content: Message content
+            
+        Returns:
+            Id of the message in the advanced context manager
+        """
+        python_code, code_snippets = self._parse_code(content)
+        if role != "assistant":
+            python_code = None
+        
+        self.conversation_manager._append_parsed(role, content, python_code)
+        return self.advanced_context_manager._append_parsed(role, content, code_snippets)
+    
+    def _parse_code(self, content: str) -> Tuple[Optional[str], List[str]]:
+        """
+        Extract code from a message, scanning it only when it has fences.
+        
+        Returns:
+            Tuple of (first python block, all code snippets)
+        """
+        # Most replies have no fences, so skip the regexes when there are none
+        has_fences = "```" in content
+        blocks = _CODE_BLOCK_RE.findall(content) if has_fences else []
+        
+        # The conversation history keeps the first python block, found the
+        # same way ConversationManager finds it so both paths agree
+        match = _CODE_RE.search(content) if has_fences else None
+        python_code = match.group(1).strip() if match else None
+        
+        # The context manager keeps every block, or indented code when unfenced
+        if blocks:
+            code_snippets = [body.strip() for _, body in blocks if body.strip()]
+        else:
+            code_snippets = [
+                block.strip()
+                for block in self.advanced_context_manager._extract_indented_code(content)
+                if block.strip()
+            ]
+        return python_code, code_snippets
@@ -5,8 +5,54 @@ This module manages conversation history and context for the chatbot.
 """
 
 import re
-import json
+import zlib
+import struct
+from collections import deque
 from typing import List, Dict, Any, Optional
+from utils.json_utils import json_dumps, json_loads
+
+# Try importing optional dependencies with fallbacks
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+try:
+    import blosc
+    BLOSC_AVAILABLE = True
+except ImportError:
+    BLOSC_AVAILABLE = False
+
+# Markdown python code block
+_CODE_RE = re.compile(r"```python(.*?)```", re.DOTALL)
+
+# File suffix that selects the MessagePack export format
+MSGPACK_SUFFIX = ".msgpack"
+
+# MessagePack exports are framed with a 4-byte big-endian payload length
+_FRAME_HEADER = struct.Struct(">I")
+
+# File suffix that selects the compressed, chunked MessagePack archive
+ARCHIVE_SUFFIX = ".msgpack.blp"
+
+# Archive layout: magic, codec and chunk count, then a (compressed length,
+# message count) entry per chunk, followed by the compressed chunks in order
+_ARCHIVE_MAGIC = b"PBCP"
+_ARCHIVE_HEADER = struct.Struct(">4sBI")
+_ARCHIVE_ENTRY = struct.Struct(">II")
+_ARCHIVE_CHUNK_SIZE = 256  # Messages per compressed chunk
+_CODEC_ZLIB = 0
+_CODEC_BLOSC = 1
+
+if MSGSPEC_AVAILABLE:
+    class _Transcript(msgspec.Struct):
+        """Exported conversation, validated on decode."""
+        messages: List[Dict[str, str]]
+    
+    _MSGPACK_ENCODER = msgspec.msgpack.Encoder()
+    _MSGPACK_DECODER = msgspec.msgpack.Decoder(_Transcript)
+    _MSGPACK_LIST_DECODER = msgspec.msgpack.Decoder(List[Dict[str, str]])
 
 class ConversationManager:
     """Manages conversation history and context for the chatbot."""
@@ -14,30 +60,41 @@ class ConversationManager:
     def __init__(self, max_turns: int = 10):
         """Initialize conversation manager with specified maximum turns."""
         self.max_turns = max_turns
-        self.messages = []
-        self.code_snippets = []
+        # Each turn has user + assistant message; the oldest are evicted automatically
+        self.messages = deque(maxlen=max_turns * 2)
+        # Snippets of the retained messages, maintained as messages are added
+        self.code_snippets = deque()
+        # Sequence number of the message each snippet came from
+        self._snippet_owners = deque()
+        self._added = 0
     
     def add_message(self, role: str, content: str) -> None:
         """Add a message to the conversation history."""
-        self.messages.append({"role": role, "content": content})
-        
         # Extract code snippets from assistant messages
-        if role == "assistant" and self._contains_code(content):
-            code = self._extract_code(content)
-            if code:
-                self.code_snippets.append(code)
+        code = self._extract_code(content) if role == "assistant" else None
+        self._append_parsed(role, content, code)
+    
+    def _append_parsed(self, role: str, content: str, code: Optional[str]) -> None:
+        """Add a message whose code snippet has already been extracted."""
+        # Drop the snippet of the message the deque is about to evict
+        evicted = self._added - self.messages.maxlen
+        if self._snippet_owners and self._snippet_owners[0] == evicted:
+            self._snippet_owners.popleft()
+            self.code_snippets.popleft()
         
-        # Trim conversation if it exceeds max turns
-        if len(self.messages) > self.max_turns * 2:  # Each turn has user + assistant message
-            self.messages = self.messages[-self.max_turns * 2:]
+        self.messages.append({"role": role, "content": content})
+        if code:
+            self.code_snippets.append(code)
+            self._snippet_owners.append(self._added)
+        self._added += 1
     
     def get_messages(self) -> List[Dict[str, str]]:
         """Get all messages in the conversation history."""
-        return self.messages
+        return list(self.messages)
     
     def get_code_snippets(self) -> List[str]:
         """Get all code snippets from the conversation."""
-        return self.code_snippets
+        return list(self.code_snippets)
     
     def get_latest_code(self) -> Optional[str]:
         """Get the most recent code snippet."""
@@ -45,54 +102,145 @@ class ConversationManager:
     
     def clear(self) -> None:
         """Clear the conversation history."""
-        self.messages = []
-        self.code_snippets = []
-    
-    def _contains_code(self, text: str) -> bool:
-        """Check if text contains code blocks."""
-        return bool(re.search(r"```python(.*?)```", text, re.DOTALL))
+        self.messages.clear()
+        self.code_snippets.clear()
+        self._snippet_owners.clear()
+        self._added = 0
     
     def _extract_code(self, text: str) -> Optional[str]:
-        """Extract code from markdown code blocks."""
-        code_blocks = re.findall(r"```python(.*?)```", text, re.DOTALL)
-        if code_blocks:
-            return code_blocks[0].strip()
-        return None
+        """Extract the first code block from markdown, or None if there is none."""
+        match = _CODE_RE.search(text)
+        return match.group(1).strip() if match else None
     
     def export_to_file(self, filename: str) -> bool:
-        """Export conversation history to a file."""
+        """
+        Export conversation history to a file.
+        
+        Files ending in .msgpack are written as framed MessagePack and files
+        ending in .msgpack.blp as a compressed, chunked MessagePack archive
+        (both require msgspec); anything else is written as JSON.
+        """
+        # Serialize up front to bytes and write once
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(self.messages, f, indent=2)
+            if filename.endswith(ARCHIVE_SUFFIX):
+                if not MSGSPEC_AVAILABLE:
+                    return False
+                data = self._encode_archive()
+            elif filename.endswith(MSGPACK_SUFFIX):
+                if not MSGSPEC_AVAILABLE:
+                    return False
+                payload = _MSGPACK_ENCODER.encode(_Transcript(list(self.messages)))
+                data = _FRAME_HEADER.pack(len(payload)) + payload
+            else:
+                data = json_dumps(list(self.messages), indent=True)
+            with open(filename, 'wb') as f:
+                f.write(data)
             return True
         except Exception:
-            # Fallback to ASCII encoding if UTF-8 fails
-            try:
-                with open(filename, 'w', encoding='ascii', errors='replace') as f:
-                    json.dump(self.messages, f, indent=2)
-                return True
-            except Exception:
-                return False
+            return False
     
     def import_from_file(self, filename: str) -> bool:
-        """Import conversation history from a file."""
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                self.messages = json.load(f)
-        except UnicodeDecodeError:
-            # Fallback to ASCII encoding if UTF-8 fails
+        """Import conversation history from a JSON, MessagePack or archive export."""
+        with open(filename, 'rb') as f:
+            magic = f.read(len(_ARCHIVE_MAGIC))
+            if magic == _ARCHIVE_MAGIC:
+                messages = self._read_archive(f)
+            else:
+                data = magic + f.read()
+        
+        # JSON exports start with '['; MessagePack frames with a length header
+        if magic == _ARCHIVE_MAGIC:
+            if messages is None:
+                return False
+        elif data.lstrip()[:1] == b'[':
             try:
-                with open(filename, 'r', encoding='ascii', errors='replace') as f:
-                    self.messages = json.load(f)
-            except Exception:
+                messages = json_loads(data)
+            except ValueError:
+                # Fallback to ASCII decoding if the file is not valid UTF-8
+                try:
+                    messages = json_loads(data.decode('ascii', errors='replace'))
+                except ValueError:
+                    return False
+        else:
+            messages = self._decode_msgpack(data)
+            if messages is None:
                 return False
-                
-        # Rebuild code snippets
-        self.code_snippets = []
-        for msg in self.messages:
-            if msg["role"] == "assistant" and self._contains_code(msg["content"]):
-                code = self._extract_code(msg["content"])
-                if code:
-                    self.code_snippets.append(code)
+        self.clear()
+        for msg in messages:
+            role = msg["role"]
+            code = self._extract_code(msg["content"]) if role == "assistant" else None
+            self._append_parsed(role, msg["content"], code)
         
         return True
+    
+    def _decode_msgpack(self, data: bytes) -> Optional[List[Dict[str, str]]]:
+        """Decode a framed MessagePack export, or return None if it is invalid."""
+        if not MSGSPEC_AVAILABLE or len(data) < _FRAME_HEADER.size:
+            return None
+        
+        (length,) = _FRAME_HEADER.unpack_from(data)
+        payload = memoryview(data)[_FRAME_HEADER.size:_FRAME_HEADER.size + length]
+        try:
+            return _MSGPACK_DECODER.decode(payload).messages
+        except msgspec.DecodeError:
+            return None
+    
+    def _encode_archive(self) -> bytes:
+        """Encode the history as compressed MessagePack chunks behind a header."""
+        codec = _CODEC_BLOSC if BLOSC_AVAILABLE else _CODEC_ZLIB
+        messages = list(self.messages)
+        entries = []
+        chunks = []
+        for start in range(0, len(messages), _ARCHIVE_CHUNK_SIZE):
+            batch = messages[start:start + _ARCHIVE_CHUNK_SIZE]
+            payload = _MSGPACK_ENCODER.encode(batch)
+            if codec == _CODEC_BLOSC:
+                chunk = blosc.compress(payload, typesize=1, cname='zstd', clevel=3)
+            else:
+                chunk = zlib.compress(payload, 3)
+            entries.append(_ARCHIVE_ENTRY.pack(len(chunk), len(batch)))
+            chunks.append(chunk)
+        
+        header = _ARCHIVE_HEADER.pack(_ARCHIVE_MAGIC, codec, len(chunks))
+        return b"".join([header, *entries, *chunks])
+    
+    def _read_archive(self, f) -> Optional[List[Dict[str, str]]]:
+        """
+        Read a chunked archive whose magic has already been consumed.
+        
+        Only the trailing chunks that fit in the history are read and
+        decompressed. Returns None if the archive is invalid or its codec
+        is not installed.
+        """
+        header = f.read(_ARCHIVE_HEADER.size - len(_ARCHIVE_MAGIC))
+        if not MSGSPEC_AVAILABLE or len(header) != _ARCHIVE_HEADER.size - len(_ARCHIVE_MAGIC):
+            return None
+        _, codec, n_chunks = _ARCHIVE_HEADER.unpack(_ARCHIVE_MAGIC + header)
+        if codec == _CODEC_BLOSC:
+            if not BLOSC_AVAILABLE:
+                return None
+            decompress = blosc.decompress
+        elif codec == _CODEC_ZLIB:
+            decompress = zlib.decompress
+        else:
+            return None
+        
+        table = f.read(_ARCHIVE_ENTRY.size * n_chunks)
+        if len(table) != _ARCHIVE_ENTRY.size * n_chunks:
+            return None
+        entries = list(_ARCHIVE_ENTRY.iter_unpack(table))
+        
+        # Skip leading chunks whose messages would be evicted anyway
+        first, retained = len(entries), 0
+        while first > 0 and retained < self.messages.maxlen:
+            first -= 1
+            retained += entries[first][1]
+        f.seek(sum(length for length, _ in entries[:first]), 1)
+        
+        messages = []
+        try:
+            for length, _ in entries[first:]:
+                messages.extend(_MSGPACK_LIST_DECODER.decode(decompress(f.read(length))))
+        except (msgspec.DecodeError, zlib.error, ValueError, TypeError):
+            return None
+        return messages
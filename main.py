@@ -6,6 +6,7 @@ This module integrates all components and provides the main application function
 
 import os
 import argparse
+import threading
 from config.config_manager import ConfigManager
 from conversation.conversation_manager import ConversationManager
 from conversation.advanced_context_manager import AdvancedContextManager
@@ -13,37 +14,38 @@ from code_execution.code_executor import CodeExecutor
 from api.api_client import APIClient
 from utils.code_manager import CodeManager
 from utils.advanced_code_categorizer import AdvancedCodeCategorizer
-from ui.terminal.terminal_ui import TerminalUI
-from ui.web.web_ui import WebUI
+
+# Command-line parser, built once at import
+_PARSER = argparse.ArgumentParser(description='Advanced Python Code Assistant Bot')
+_PARSER.add_argument('--web', action='store_true', help='Start web interface')
+_PARSER.add_argument('--port', type=int, default=5000, help='Port for web interface')
+_PARSER.add_argument('--config', type=str, default='config.ini', help='Path to config file')
 
 def main(args=None):
     """Main entry point for the application."""
     # Parse command-line arguments
     if args is None:
-        parser = argparse.ArgumentParser(description='Advanced Python Code Assistant Bot')
-        parser.add_argument('--web', action='store_true', help='Start web interface')
-        parser.add_argument('--port', type=int, default=5000, help='Port for web interface')
-        parser.add_argument('--config', type=str, default='config.ini', help='Path to config file')
-        args = parser.parse_args()
+        args = _PARSER.parse_args()
     
     # Initialize components
     config_manager = ConfigManager(args.config)
-    conversation_manager = ConversationManager(
-        max_turns=int(config_manager.get("app", "max_conversation_turns", 10))
-    )
-    advanced_context_manager = AdvancedContextManager()
     code_executor = CodeExecutor(
         timeout=int(config_manager.get("app", "code_execution_timeout", 5))
     )
     api_client = APIClient(config_manager)
+    code_categorizer = AdvancedCodeCategorizer()
     code_manager = CodeManager(
-        save_folder=config_manager.get("app", "save_folder", "bot_outputs")
+        save_folder=config_manager.get("app", "save_folder", "bot_outputs"),
+        categorizer=code_categorizer
     )
-    code_categorizer = AdvancedCodeCategorizer()
     
     # Start appropriate interface
     if args.web:
-        # Start web interface
+        # Start web interface (imported here so terminal runs skip Flask)
+        from ui.web.web_ui import WebUI
+        conversation_manager = ConversationManager(
+            max_turns=int(config_manager.get("app", "max_conversation_turns", 10))
+        )
         web_ui = WebUI(
             config_manager=config_manager,
             conversation_manager=conversation_manager,
@@ -51,23 +53,30 @@ def main(args=None):
             code_executor=code_executor,
             code_manager=code_manager
         )
+        # Open the API connection in the background while the server starts
+        threading.Thread(target=api_client.prewarm, daemon=True).start()
         web_ui.run(host='0.0.0.0', port=args.port, debug=False)
     else:
-        # Start terminal interface
+        # Start terminal interface (imported here so web runs skip rich)
+        from ui.terminal.terminal_ui import TerminalUI
         terminal_ui = TerminalUI(config_manager)
         run_terminal_interface(
             terminal_ui=terminal_ui,
-            conversation_manager=conversation_manager,
-            advanced_context_manager=advanced_context_manager,
+            advanced_context_manager=AdvancedContextManager(),
             api_client=api_client,
             code_executor=code_executor,
             code_manager=code_manager,
             code_categorizer=code_categorizer
         )
 
-def run_terminal_interface(terminal_ui, conversation_manager, advanced_context_manager, 
+def run_terminal_interface(terminal_ui, advanced_context_manager,
                           api_client, code_executor, code_manager, code_categorizer):
-    """Run the terminal interface."""
+    """
+    Run the terminal interface.
+    
+    The advanced context manager is the single store of conversation
+    history here, so each message is processed only once per turn.
+    """
     terminal_ui.display_welcome()
     
     while True:
@@ -80,7 +89,6 @@ def run_terminal_interface(terminal_ui, conversation_manager, advanced_context_m
             break
         
         # Add user message to conversation
-        conversation_manager.add_message("user", user_input)
         advanced_context_manager.add_message("user", user_input)
         
         # Display thinking animation and get response from API
@@ -91,43 +99,39 @@ def run_terminal_interface(terminal_ui, conversation_manager, advanced_context_m
             # Get response from API
             return api_client.get_completion(context)
         
-        terminal_ui.display_thinking(get_response)
-        
-        # Get response
-        context = advanced_context_manager.get_optimized_context()
-        response = api_client.get_completion(context)
+        response = terminal_ui.display_thinking(get_response)
         
         # Add assistant message to conversation
-        conversation_manager.add_message("assistant", response)
         advanced_context_manager.add_message("assistant", response)
         
         # Display response
         terminal_ui.display_message(response, is_user=False)
         
-        # Check if response contains code
-        if code_manager.detect_code(response):
-            code = code_manager.extract_code(response)
-            if code:
-                # Ask if user wants to execute the code
-                terminal_ui.display_message("Would you like to execute this code? (y/n)", is_user=False)
-                execute_input = terminal_ui.get_user_input()
+        # Extract code from the response; unfenced code only counts when
+        # the detection heuristics agree, so prose is not offered for execution
+        code_snippets = code_manager.detect_and_extract(response)
+        if code_snippets:
+            code = code_snippets[0]
+            # Ask if user wants to execute the code
+            terminal_ui.display_message("Would you like to execute this code? (y/n)", is_user=False)
+            execute_input = terminal_ui.get_user_input()
+            
+            if execute_input.lower() in ['y', 'yes']:
+                # Execute code
+                output, error, success = code_executor.execute_code(code)
+                
+                # Display results
+                terminal_ui.display_code_execution_result(output, error, success)
                 
-                if execute_input.lower() in ['y', 'yes']:
-                    # Execute code
-                    output, error, success = code_executor.execute_code(code)
-                    
-                    # Display results
-                    terminal_ui.display_code_execution_result(output, error, success)
-                    
-                    # Save code if successful
-                    if success:
-                        # Use advanced categorization
-                        category, confidence, _ = code_categorizer.get_category_suggestions(code)[0]
-                        if confidence < 0.5:
-                            category = "general"
-                            
-                        file_path = code_manager.save_code(code, category)
-                        terminal_ui.display_success(f"Code saved to {file_path}")
+                # Save code if successful
+                if success:
+                    # Use advanced categorization
+                    category, confidence = code_categorizer.get_category_suggestions(code, top_n=1)[0]
+                    if confidence < 0.5:
+                        category = "general"
+                        
+                    file_path = code_manager.save_code(code, category)
+                    terminal_ui.display_success(f"Code saved to {file_path}")
 
 if __name__ == '__main__':
     main()
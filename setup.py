@@ -6,9 +6,20 @@ setup(
     packages=find_packages(),
     install_requires=[
         "openai",
+        "httpx",
         "flask",
         "rich"
     ],
+    extras_require={
+        'speedups': [
+            "tiktoken",
+            "orjson",
+            "msgspec",
+            "blosc",
+            "pyahocorasick",
+            "hyperscan",
+        ],
+    },
     entry_points={
         'console_scripts': [
             'python_bot=python_bot_upgraded.main:main',
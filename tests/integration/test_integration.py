@@ -30,15 +30,26 @@ class IntegrationTest(unittest.TestCase):
             stderr=subprocess.PIPE
         )
         
-        # Wait for server to start
-        time.sleep(3)
-        
         # Base URL for API requests
         cls.base_url = "http://localhost:5001"
+        
+        # Share one keep-alive connection pool across all requests
+        cls.session = requests.Session()
+        
+        # Wait for server to start, polling until it answers (up to 10s)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                cls.session.get(f"{cls.base_url}/api/history", timeout=0.2)
+                break
+            except requests.RequestException:
+                time.sleep(0.05)
     
     @classmethod
     def tearDownClass(cls):
         """Clean up test environment by stopping the web server."""
+        cls.session.close()
+        
         # Stop the web server
         cls.server_process.terminate()
         cls.server_process.wait()
@@ -46,7 +57,7 @@ class IntegrationTest(unittest.TestCase):
     def test_chat_endpoint(self):
         """Test the chat API endpoint."""
         # Send a chat message
-        response = requests.post(
+        response = self.session.post(
             f"{self.base_url}/api/chat",
             json={"message": "How do I read a CSV file in pandas?"}
         )
@@ -68,7 +79,7 @@ class IntegrationTest(unittest.TestCase):
         """Test the code execution API endpoint."""
         # Send code to execute
         code = "x = 5\ny = 10\nprint(x + y)"
-        response = requests.post(
+        response = self.session.post(
             f"{self.base_url}/api/execute",
             json={"code": code}
         )
@@ -84,13 +95,13 @@ class IntegrationTest(unittest.TestCase):
     def test_history_endpoint(self):
         """Test the history API endpoint."""
         # First send a chat message
-        requests.post(
+        self.session.post(
             f"{self.base_url}/api/chat",
             json={"message": "What is Python?"}
         )
         
         # Get history
-        response = requests.get(f"{self.base_url}/api/history")
+        response = self.session.get(f"{self.base_url}/api/history")
         
         # Check response
         self.assertEqual(response.status_code, 200)
@@ -101,13 +112,13 @@ class IntegrationTest(unittest.TestCase):
     def test_clear_endpoint(self):
         """Test the clear API endpoint."""
         # First send a chat message
-        requests.post(
+        self.session.post(
             f"{self.base_url}/api/chat",
             json={"message": "Hello"}
         )
         
         # Clear history
-        response = requests.post(f"{self.base_url}/api/clear")
+        response = self.session.post(f"{self.base_url}/api/clear")
         
         # Check response
         self.assertEqual(response.status_code, 200)
@@ -116,7 +127,7 @@ class IntegrationTest(unittest.TestCase):
         self.assertTrue(data["success"])
         
         # Check if history is cleared
-        history_response = requests.get(f"{self.base_url}/api/history")
+        history_response = self.session.get(f"{self.base_url}/api/history")
         history_data = history_response.json()
         self.assertEqual(len(history_data["messages"]), 0)
     
@@ -132,7 +143,7 @@ df.describe()
 plt.plot(df['x'], df['y'])
 plt.show()
 """
-        response = requests.post(
+        response = self.session.post(
             f"{self.base_url}/api/categorize",
             json={"code": code}
         )
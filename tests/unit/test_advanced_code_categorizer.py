@@ -1,4 +1,6 @@
 import unittest
+from unittest import mock
+from utils import advanced_code_categorizer
 from utils.advanced_code_categorizer import AdvancedCodeCategorizer
 
 class TestAdvancedCodeCategorizer(unittest.TestCase):
@@ -133,6 +135,97 @@ plt.savefig('model.png')
             ("data_analysis" in categories and "machine_learning" in categories) or
             ("data_analysis" in categories and "data_analysis" == suggestions[0][0])
         )
+    
+    def test_import_analysis(self):
+        """Test that imported modules are counted towards their categories."""
+        code = self.categorizer._normalize_code(
+            "import os\nimport requests\nfrom flask.views import MethodView\nimport httpx\n"
+        )
+        scores = self.categorizer._analyze_imports(code)
+        
+        self.assertEqual(set(scores), {"system", "web_development", "networking"})
+        self.assertAlmostEqual(scores["web_development"], 0.5)
+        self.assertAlmostEqual(scores["system"], 0.25)
+    
+    def test_anchored_suggestion_skips_scoring(self):
+        """Test that obvious code is categorized from anchors alone."""
+        code = "from flask import Flask\napp = Flask(__name__)\n"
+        
+        with mock.patch.object(self.categorizer, "_weighted_scores") as categorize:
+            suggestions = self.categorizer.get_category_suggestions(code, top_n=1)
+        
+        categorize.assert_not_called()
+        self.assertEqual(suggestions, [("web_development", 1.0)])
+        
+        suggestions = self.categorizer.get_category_suggestions(code, top_n=3)
+        self.assertEqual(len(suggestions), 3)
+        self.assertEqual(suggestions[0][0], "web_development")
+    
+    def test_structure_analysis(self):
+        """Test that structure patterns are counted per category in one scan."""
+        code = self.categorizer._normalize_code(
+            "df = pd.read_csv('a.csv')\ndf.plot()\nconn = sqlite3.connect('db')\nconn.cursor().execute('x')\n"
+        )
+        scores = self.categorizer._analyze_structure(code)
+        
+        self.assertEqual(set(scores), {"data_analysis", "database"})
+        self.assertAlmostEqual(scores["data_analysis"], 0.4)
+        self.assertAlmostEqual(scores["database"], 0.6)
+    
+    def test_keyword_scan_matches_fallback(self):
+        """Test that the single-pass keyword scan scores like per-keyword counting."""
+        code = "import pandas as pd\ndf = pd.read_csv('data.csv')\nlabel = 'textext'\nrequest.get(url)\n".lower()
+        with mock.patch.object(advanced_code_categorizer, "AHOCORASICK_AVAILABLE", False):
+            fallback = AdvancedCodeCategorizer()
+        
+        self.assertIsNone(fallback._keyword_automaton)
+        self.assertEqual(self.categorizer._analyze_keywords(code), fallback._analyze_keywords(code))
+        self.assertIn("data_analysis", fallback._analyze_keywords(code))
+    
+    def test_repeated_code_reuses_scores(self):
+        """Test that repeated snippets skip analysis but still apply history bias."""
+        code = "import pandas as pd\ndf = pd.read_csv('data.csv')\n"
+        first = self.categorizer.categorize(code)
+        
+        with mock.patch.object(self.categorizer, "_normalize_code") as normalize:
+            second = self.categorizer.categorize(code)
+        
+        normalize.assert_not_called()
+        self.assertEqual(second[0], first[0])
+        self.assertEqual(self.categorizer.category_history["data_analysis"], 2)
+    
+    def test_structure_scan_matches_fallback(self):
+        """Test that the Hyperscan structure scan counts like the regex fallback."""
+        code = self.categorizer._normalize_code(
+            "app = Flask(__name__)\n@app.route('/')\ndef index():\n    return render_template('i.html')\n"
+            "model.fit(X, y)\nmodel.predict(X)\n"
+        )
+        with mock.patch.object(advanced_code_categorizer, "HYPERSCAN_AVAILABLE", False):
+            fallback = AdvancedCodeCategorizer()
+        
+        self.assertIsNone(fallback._structure_db)
+        self.assertEqual(self.categorizer._analyze_structure(code), fallback._analyze_structure(code))
+        self.assertAlmostEqual(fallback._analyze_structure(code)["web_development"], 0.6)
+    
+    def test_code_without_triggers_is_general(self):
+        """Test that code with no scoring substrings skips analysis."""
+        with mock.patch.object(self.categorizer, "_normalize_code") as normalize:
+            result = self.categorizer.categorize("x = 1\nprint(x * 2)\n")
+        
+        normalize.assert_not_called()
+        self.assertEqual(result, ("general", 0.0, {"general": 1.0}))
+        self.assertEqual(sum(self.categorizer.category_history.values()), 0)
+    
+    def test_history_bias_tracks_running_total(self):
+        """Test that the cached history total and bias factors follow the history."""
+        code = "import pandas as pd\ndf = pd.DataFrame()\ndf.groupby('a').mean()"
+        for _ in range(3):
+            self.categorizer.categorize(code)
+        
+        history = self.categorizer.category_history
+        self.assertEqual(self.categorizer._history_total, sum(history.values()))
+        index = self.categorizer._categories.index("data_analysis")
+        self.assertAlmostEqual(self.categorizer._history_factors[index], 1.2)
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,4 +1,10 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
 import unittest
+from unittest import mock
+from conversation import advanced_context_manager
 from conversation.advanced_context_manager import AdvancedContextManager
 
 class TestAdvancedContextManager(unittest.TestCase):
@@ -93,6 +99,180 @@ class TestAdvancedContextManager(unittest.TestCase):
         messages = self.context_manager.messages
         last_message = messages[-1]
         self.assertEqual(last_message["content"], "Assistant message 14")
+    
+    def test_token_count_tracks_retained_messages(self):
+        """Test that the running token count matches the retained messages."""
+        for i in range(15):
+            self.context_manager.add_message("user", f"User message {i}")
+            self.assertEqual(
+                self.context_manager._total_tokens,
+                sum(m["tokens"] for m in self.context_manager.messages)
+            )
+    
+    def test_message_ids_not_reused_after_optimization(self):
+        """Test that message ids stay unique once old messages are pruned."""
+        ids = [self.context_manager.add_message("user", f"User message {i}") for i in range(25)]
+        self.assertEqual(len(set(ids)), 25)
+        
+        retained_ids = [m["id"] for m in self.context_manager.messages]
+        self.assertEqual(retained_ids, sorted(set(retained_ids)))
+        self.assertEqual(retained_ids[-1], ids[-1])
+    
+    def test_resume_from_database(self):
+        """Test that messages persisted to SQLite are restored in a new session."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "context.db")
+            
+            context_manager = AdvancedContextManager(max_context_length=2000, max_messages=10, db_path=db_path)
+            context_manager.add_message("system", "You are a helpful Python assistant.")
+            context_manager.add_message("user", "How do I read a CSV file with pandas?")
+            context_manager.add_message("assistant", "Use pd.read_csv:\n```python\nimport pandas as pd\ndf = pd.read_csv('data.csv')\n```")
+            context = context_manager.get_optimized_context()
+            context_manager.close()
+            
+            resumed = AdvancedContextManager(max_context_length=2000, max_messages=10, db_path=db_path)
+            self.assertEqual(resumed.get_optimized_context(), context)
+            self.assertEqual(resumed.current_topic, context_manager.current_topic)
+            self.assertIn("code_snippets", resumed.messages[2])
+            self.assertEqual(resumed.add_message("user", "Thanks!"), 3)
+            resumed.close()
+    
+    def test_repeated_content_reuses_extracted_code(self):
+        """Test that code is extracted once for repeated message content."""
+        content = "Try this:\n```python\nprint('hello')\n```"
+        
+        with mock.patch.object(self.context_manager, "_extract_code",
+                               wraps=self.context_manager._extract_code) as extract_code:
+            self.context_manager.add_message("assistant", content)
+            self.context_manager.add_message("assistant", content)
+        
+        self.assertEqual(extract_code.call_count, 1)
+        self.assertEqual(self.context_manager.messages[1]["code_snippets"], ["print('hello')"])
+    
+    def test_overflow_eviction_keeps_indexes_consistent(self):
+        """Test that evicting the oldest messages keeps position lookups valid."""
+        for i in range(25):
+            self.context_manager.add_message("user", f"Question {i} about pandas dataframes")
+        
+        messages = self.context_manager.messages
+        self.assertEqual(len(messages), self.context_manager.max_messages)
+        self.assertEqual(messages[0]["content"], "Question 15 about pandas dataframes")
+        for position, message in enumerate(messages):
+            self.assertEqual(self.context_manager._positions_of([message["id"]]), [position])
+        
+        relevant = self.context_manager.get_relevant_context("pandas dataframes", max_messages=3)
+        self.assertEqual(relevant[-1]["content"], "Question 24 about pandas dataframes")
+    
+    def test_code_references_use_stable_keys(self):
+        """Test that code references are keyed by a stable snippet digest."""
+        message_id = self.context_manager.add_message("assistant", "```python\nprint('hello')\n```")
+        
+        key = hashlib.blake2b("print('hello')".encode('utf-8'), digest_size=16).digest()
+        self.assertEqual(self.context_manager.code_references, {key: message_id})
+    
+    def test_extract_entities_and_keywords(self):
+        """Test that code keywords and entities are extracted from one message."""
+        entities, keywords = self.context_manager._extract_entities_and_keywords(
+            "import requests\ndef fetch(url):\n    return requests.get(url)\nprint(\"Hello World\")"
+        )
+        
+        self.assertIn("Hello World", entities)
+        for keyword in ("requests", "fetch", "get", "print"):
+            self.assertIn(keyword, keywords)
+    
+    def test_optimization_prunes_stale_references(self):
+        """Test that topics and code references only point at retained messages."""
+        for i in range(15):
+            self.context_manager.add_message("user", f"Show me example {i}?")
+            self.context_manager.add_message("assistant", f"```python\nprint({i})\n```")
+        
+        retained_ids = {m["id"] for m in self.context_manager.messages}
+        topic_ids = {i for ids in self.context_manager.topics.values() for i in ids}
+        self.assertLessEqual(topic_ids, retained_ids)
+        self.assertLessEqual(set(self.context_manager.code_references.values()), retained_ids)
+        self.assertLessEqual(len(self.context_manager.code_references),
+                             self.context_manager.max_messages * 4)
+    
+    def test_reset_clears_conversation_in_place(self):
+        """Test that reset empties the conversation and its stored messages."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "context.db")
+            
+            context_manager = AdvancedContextManager(db_path=db_path)
+            context_manager.add_message("user", "How do I read a CSV file with pandas?")
+            context_manager.add_message("assistant", "```python\nimport pandas as pd\n```")
+            context_manager.reset()
+            
+            self.assertEqual(context_manager.get_optimized_context(), [])
+            self.assertEqual(len(context_manager.code_references), 0)
+            self.assertIsNone(context_manager.current_topic)
+            self.assertEqual(context_manager.add_message("user", "Hello"), 2)
+            context_manager.close()
+            
+            resumed = AdvancedContextManager(db_path=db_path)
+            self.assertEqual([m["content"] for m in resumed.messages], ["Hello"])
+            resumed.close()
+    
+    def test_vocabulary_bounded_under_eviction(self):
+        """Test that the term vocabulary stays bounded when messages are only evicted."""
+        for i in range(3000):
+            self.context_manager.add_message("user", f"word{i}a word{i}b word{i}c word{i}d")
+        
+        self.assertEqual(len(self.context_manager.messages), self.context_manager.max_messages)
+        self.assertLessEqual(len(self.context_manager._vocab), advanced_context_manager._MAX_VOCAB_SIZE)
+        query = "word2999a word2999b"
+        relevant = self.context_manager.get_relevant_context(query, max_messages=1)
+        self.assertEqual(relevant[0]["content"], "word2999a word2999b word2999c word2999d")
+    
+    def test_eviction_drops_empty_topics(self):
+        """Test that topics without retained messages are removed on eviction."""
+        self.context_manager.add_message("user", "How do I fix this bug?")
+        for i in range(10):
+            self.context_manager.add_message("user", f"Load the dataframe {i}")
+        
+        self.assertNotIn("code_help", self.context_manager.topics)
+        self.assertEqual(list(self.context_manager.topics), ["data_analysis"])
+    
+    def test_overlapping_keywords_and_entities(self):
+        """Test that keyword and entity patterns may match the same text."""
+        entities, keywords = self.context_manager._extract_entities_and_keywords(
+            'MAX_SIZE = 10\nlabel = "def helper"'
+        )
+        
+        self.assertIn("MAX_SIZE", entities)
+        self.assertIn("MAX_SIZE", keywords)
+        self.assertIn("def helper", entities)
+        self.assertIn("helper", keywords)
+    
+    def test_database_prunes_dropped_messages(self):
+        """Test that the on-disk store only keeps messages in the retained context."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            context_manager = AdvancedContextManager(
+                max_context_length=2000, max_messages=10, db_path=os.path.join(tmp_dir, "context.db")
+            )
+            for i in range(25):
+                context_manager.add_message("user", f"Question {i}")
+            
+            stored_ids = [row[0] for row in context_manager._db.execute("SELECT id FROM messages ORDER BY id")]
+            self.assertEqual(stored_ids, [m["id"] for m in context_manager.messages])
+            context_manager.close()
+    
+    def test_failed_importance_update_rolls_back(self):
+        """Test that a failed batch update does not leave a transaction open."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            context_manager = AdvancedContextManager(db_path=os.path.join(tmp_dir, "context.db"))
+            context_manager.add_message("user", "Hello")
+            connection = context_manager._db
+            context_manager._db = mock.Mock(wraps=connection)
+            context_manager._db.executemany.side_effect = sqlite3.OperationalError("disk I/O error")
+            
+            with self.assertRaises(sqlite3.OperationalError):
+                context_manager.update_importance_scores()
+            self.assertFalse(connection.in_transaction)
+            
+            context_manager._db = connection
+            context_manager.add_message("user", "Still works")
+            context_manager.close()
 
 if __name__ == '__main__':
     unittest.main()
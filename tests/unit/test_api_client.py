@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+from api.api_client import APIClient
+
+class StubConfigManager:
+    """Minimal configuration manager returning defaults and a fake API key."""
+    
+    def get(self, section, key, default=None):
+        return default
+    
+    def get_api_key(self):
+        return "test_api_key"
+
+class LocalConfigManager(StubConfigManager):
+    """Configuration manager pointing the client at a local HTTP server."""
+    
+    def __init__(self, base_url):
+        self.base_url = base_url
+    
+    def get(self, section, key, default=None):
+        if (section, key) == ("api", "base_url"):
+            return self.base_url
+        return default
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """Keep-alive request handler answering HEAD requests without logging."""
+    
+    protocol_version = "HTTP/1.1"
+    
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+    
+    def log_message(self, *args):
+        pass
+
+class TestAPIClient(unittest.TestCase):
+    """Test cases for the APIClient class."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.api_client = APIClient(StubConfigManager())
+        self.api_client.client = mock.MagicMock()
+        completion = self.api_client.client.chat.completions.create
+        completion.return_value.choices = [mock.MagicMock()]
+        completion.return_value.choices[0].message.content = "Hello!"
+        self.completion = completion
+    
+    def test_deterministic_completion_is_cached(self):
+        """Test that repeated zero-temperature requests hit the cache."""
+        messages = [{"role": "user", "content": "Show the help menu"}]
+        
+        first = self.api_client.get_completion(messages, temperature=0.0)
+        second = self.api_client.get_completion(messages, temperature=0.0)
+        
+        self.assertEqual(first, "Hello!")
+        self.assertEqual(second, "Hello!")
+        self.assertEqual(self.completion.call_count, 1)
+        self.assertEqual(self.api_client.cache_stats, {"hits": 1, "misses": 1})
+    
+    def test_creative_completion_is_not_cached(self):
+        """Test that non-zero temperature requests always reach the API."""
+        messages = [{"role": "user", "content": "Tell me a story"}]
+        
+        self.api_client.get_completion(messages, temperature=0.7)
+        self.api_client.get_completion(messages, temperature=0.7)
+        
+        self.assertEqual(self.completion.call_count, 2)
+        self.assertEqual(self.api_client.cache_stats, {"hits": 0, "misses": 0})
+    
+    def test_errors_are_not_cached(self):
+        """Test that failed requests are retried instead of cached."""
+        messages = [{"role": "user", "content": "Hello"}]
+        self.completion.side_effect = RuntimeError("boom")
+        
+        response = self.api_client.get_completion(messages, temperature=0.0)
+        self.assertTrue(response.startswith("Error:"))
+        
+        self.completion.side_effect = None
+        response = self.api_client.get_completion(messages, temperature=0.0)
+        self.assertEqual(response, "Hello!")
+        self.assertEqual(self.completion.call_count, 2)
+    
+    def test_connection_pool_is_reused_and_closed(self):
+        """Test that the HTTP pool survives re-initialization and is released on close."""
+        with APIClient(StubConfigManager()) as api_client:
+            http_client = api_client._http
+            api_client._initialize_client()
+            self.assertIs(api_client._http, http_client)
+        
+        self.assertIsNone(api_client._http)
+        self.assertTrue(http_client.is_closed)
+    
+    def test_async_completion_shares_cache(self):
+        """Test that async completions reuse results cached by sync calls."""
+        messages = [{"role": "user", "content": "Show the help menu"}]
+        self.api_client.get_completion(messages, temperature=0.0)
+        
+        self.api_client.aclient = mock.AsyncMock()
+        response = asyncio.run(self.api_client.aget_completion(messages, temperature=0.0))
+        
+        self.assertEqual(response, "Hello!")
+        self.api_client.aclient.chat.completions.create.assert_not_called()
+        self.assertEqual(self.api_client.cache_stats["hits"], 1)
+    
+    def test_streaming_chunks_are_batched(self):
+        """Test that streamed chunks are coalesced into batched callbacks."""
+        chunks = []
+        for token in "abcdefghij":
+            chunk = mock.MagicMock()
+            chunk.choices[0].delta.content = token
+            chunks.append(chunk)
+        self.completion.return_value = iter(chunks)
+        received = []
+        
+        self.api_client.get_streaming_completion(
+            [{"role": "user", "content": "Hi"}], received.append, batch_size=4, flush_interval=60
+        )
+        
+        self.assertEqual(received, ["abcd", "efgh", "ij"])
+    
+    def test_close_releases_async_pool(self):
+        """Test that close also closes the asynchronous connection pool."""
+        with APIClient(StubConfigManager()) as api_client:
+            api_client._initialize_async_client()
+            async_http = api_client._ahttp
+        
+        self.assertIsNone(api_client._ahttp)
+        self.assertIsNone(api_client.aclient)
+        self.assertTrue(async_http.is_closed)
+    
+    def test_async_streaming_chunks_are_batched(self):
+        """Test that async streaming coalesces chunks like the sync path."""
+        chunks = []
+        for token in "abcdefghij":
+            chunk = mock.MagicMock()
+            chunk.choices[0].delta.content = token
+            chunks.append(chunk)
+        
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+        
+        self.api_client.aclient = mock.MagicMock()
+        self.api_client.aclient.chat.completions.create = mock.AsyncMock(return_value=stream())
+        received = []
+        
+        async def on_batch(text):
+            received.append(text)
+        
+        asyncio.run(self.api_client.aget_streaming_completion(
+            [{"role": "user", "content": "Hi"}], on_batch, batch_size=4, flush_interval=60
+        ))
+        
+        self.assertEqual(received, ["abcd", "efgh", "ij"])
+    
+    def test_close_after_async_use_in_finished_loop(self):
+        """Test that close tolerates an async pool used by an event loop that has ended."""
+        server = HTTPServer(("127.0.0.1", 0), QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        base_url = "http://127.0.0.1:%d" % server.server_address[1]
+        
+        with APIClient(LocalConfigManager(base_url)) as api_client:
+            asyncio.run(api_client.aprewarm())
+        
+        self.assertIsNone(api_client._ahttp)
+        self.assertIsNone(api_client.aclient)
+
+if __name__ == '__main__':
+    unittest.main()
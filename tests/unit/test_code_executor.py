@@ -1,6 +1,12 @@
+import os
 import unittest
+from unittest import mock
 from code_execution.code_executor import CodeExecutor
 
+def _exit_without_result(code_bytes, timeout, conn):
+    """Child target that dies before sending a result."""
+    os._exit(3)
+
 class TestCodeExecutor(unittest.TestCase):
     """Test cases for the CodeExecutor class."""
     
@@ -70,6 +76,38 @@ print(f"Factorial of 5 is {result}")
         self.assertTrue(success)
         self.assertEqual(output.strip(), "Factorial of 5 is 120")
         self.assertEqual(error, "")
+    
+    def test_execution_timeout(self):
+        """Test that long-running code is stopped after the timeout."""
+        code_executor = CodeExecutor(timeout=1)
+        output, error, success = code_executor.execute_code("while True:\n    pass")
+        
+        self.assertFalse(success)
+        self.assertTrue("Execution Timeout" in error)
+    
+    def test_compiled_code_is_cached(self):
+        """Test that repeated snippets are compiled once and the cache is bounded."""
+        code = "x = 5\ny = 10\nprint(x + y)"
+        
+        with mock.patch("code_execution.code_executor.compile", create=True, wraps=compile) as compile_mock:
+            self.assertEqual(self.code_executor.execute_code(code)[0].strip(), "15")
+            self.assertEqual(self.code_executor.execute_code(code)[0].strip(), "15")
+        self.assertEqual(compile_mock.call_count, 1)
+        
+        self.code_executor.CODE_CACHE_SIZE = 2
+        for i in range(3):
+            self.code_executor._compile(f"print({i})")
+        self.assertEqual(len(self.code_executor._code_cache), 2)
+    
+    def test_crashed_child_is_not_reported_as_timeout(self):
+        """Test that a child exiting without a result reports its exit code."""
+        with mock.patch("code_execution.code_executor._run_compiled", _exit_without_result):
+            output, error, success = self.code_executor.execute_code("print('hi')")
+        
+        self.assertFalse(success)
+        self.assertEqual(output, "")
+        self.assertNotIn("Timeout", error)
+        self.assertIn("exit code 3", error)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import os
+import shutil
+import tempfile
+from utils.code_manager import CodeManager
+from utils.advanced_code_categorizer import AdvancedCodeCategorizer
+
+class TestCodeManager(unittest.TestCase):
+    """Test cases for the CodeManager class."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.code_manager = CodeManager(self.temp_dir.name)
+    
+    def tearDown(self):
+        """Clean up test environment."""
+        self.temp_dir.cleanup()
+    
+    def test_detect_and_extract_matches_separate_calls(self):
+        """Test that the combined pass agrees with detect_code and extract_code."""
+        texts = [
+            "Here you go:\n```python\nprint('Hello')\n```",
+            "Empty block:\n```python\n```",
+            "Run this first:\n```bash\npip install flask\n```",
+            "def greet(name):\n    return name\n",
+            "class Config\nnothing else here",
+            "Just a friendly reply.",
+        ]
+        for text in texts:
+            expected = []
+            if self.code_manager.detect_code(text):
+                code = self.code_manager.extract_code(text)
+                if code:
+                    expected.append(code)
+            self.assertEqual(self.code_manager.detect_and_extract(text), expected, text)
+    
+    def test_detect_code_indentation_heuristic(self):
+        """Test that indented text is detected as code without other patterns."""
+        indented = "    x = 1\n    y = 2\n\tz = 3\nresult"
+        self.assertTrue(self.code_manager.detect_code(indented))
+        
+        sparse = "a\nb\nc\nd\ne\nf\ng\nh\ni\n    x = 1\n    y = 2\n    z = 3"
+        self.assertFalse(self.code_manager.detect_code(sparse))
+    
+    def test_categorize_code_uses_shared_categorizer(self):
+        """Test that categorization is delegated to the advanced categorizer."""
+        categorizer = AdvancedCodeCategorizer()
+        code_manager = CodeManager(self.temp_dir.name, categorizer=categorizer)
+        code = "import pandas as pd\ndf = pd.DataFrame()\ndf.groupby('a').mean()"
+        
+        self.assertEqual(code_manager.categorize_code(code), categorizer.categorize(code)[0])
+        self.assertEqual(categorizer.category_history["data_analysis"], 2)
+        self.assertEqual(self.code_manager.categorize_code("print('hi')"), "general")
+    
+    def test_extract_code_collects_unfenced_blocks(self):
+        """Test that unfenced code blocks keep indented and empty lines and skip prose."""
+        text = (
+            "Here is the helper:\n"
+            "def add(a, b):\n"
+            "    total = a + b\n"
+            "\n"
+            "    return total\n"
+            "It adds numbers.\n"
+            "    not code\n"
+            "import os"
+        )
+        self.assertEqual(
+            self.code_manager.extract_code(text),
+            "def add(a, b):\n    total = a + b\n\n    return total\nimport os"
+        )
+    
+    def test_save_code_writes_utf8(self):
+        """Test that saved code is UTF-8 encoded, with unencodable characters replaced."""
+        path = self.code_manager.save_code("print('héllo')\nx = '\ud800'\n", "web")
+        
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), "print('héllo')\nx = '?'\n".encode("utf-8"))
+    
+    def test_save_code_uses_distinct_filenames(self):
+        """Test that saves within the same second do not overwrite each other."""
+        paths = {self.code_manager.save_code(f"x = {i}\n") for i in range(5)}
+        self.assertEqual(len(paths), 5)
+    
+    def test_save_code_recreates_removed_folder(self):
+        """Test that a category folder deleted after the first save is recreated."""
+        first = self.code_manager.save_code("x = 1\n", "web")
+        shutil.rmtree(os.path.dirname(first))
+        
+        second = self.code_manager.save_code("x = 2\n", "web")
+        self.assertTrue(os.path.exists(second))
+
+if __name__ == '__main__':
+    unittest.main()
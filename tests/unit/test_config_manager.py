@@ -96,6 +96,73 @@ class TestConfigManager(unittest.TestCase):
             new_config_manager.get("ui", "bot_name"),
             "Modified Bot Name"
         )
+    
+    def test_reload_after_external_change(self):
+        """Test that cached parses are refreshed when the file changes on disk."""
+        with open(self.config_file, 'w') as f:
+            f.write("[ui]\nbot_name = First Bot\n")
+        first_manager = ConfigManager(self.config_file)
+        first_manager.config["ui"]["bot_name"] = "Mutated Bot"
+        
+        # Instances must not share mutable state through the cache
+        self.assertEqual(ConfigManager(self.config_file).get("ui", "bot_name"), "First Bot")
+        
+        with open(self.config_file, 'w') as f:
+            f.write("[ui]\nbot_name = Second Bot Name\n")
+        self.assertEqual(ConfigManager(self.config_file).get("ui", "bot_name"), "Second Bot Name")
+    
+    def test_get_coerces_typed_values(self):
+        """Test that numeric and boolean options read from file are typed."""
+        with open(self.config_file, 'w') as f:
+            f.write("[app]\ncode_execution_timeout = 7\nauto_save_code = False\n")
+        config_manager = ConfigManager(self.config_file)
+        
+        self.assertEqual(config_manager.get("app", "code_execution_timeout"), 7)
+        self.assertIs(config_manager.get("app", "auto_save_code", True), False)
+        # Options missing from the file fall back to the defaults
+        self.assertEqual(config_manager.get("app", "max_conversation_turns"), 10)
+    
+    def test_save_replaces_non_ascii_values(self):
+        """Test that saved string values are written as ASCII."""
+        config_manager = ConfigManager(self.config_file)
+        config_manager.config["ui"]["theme"] = "darké"
+        config_manager.save()
+        
+        with open(self.config_file, encoding='ascii') as f:
+            self.assertIn("theme = dark?", f.read())
+    
+    def test_get_reflects_saved_changes(self):
+        """Test that saved edits are returned by get and invalid values fall back."""
+        config_manager = ConfigManager(self.config_file)
+        config_manager.config["ui"]["bot_name"] = "Renamed Bot"
+        config_manager.config["app"]["code_execution_timeout"] = "soon"
+        with self.assertLogs("config.config_manager", level="WARNING"):
+            config_manager.save()
+        
+        self.assertEqual(config_manager.get("ui", "bot_name"), "Renamed Bot")
+        self.assertEqual(config_manager.get("app", "code_execution_timeout", 5), 5)
+    
+    def test_set_validates_typed_values(self):
+        """Test that set coerces typed options and rejects invalid values."""
+        config_manager = ConfigManager(self.config_file)
+        config_manager.set("app", "code_execution_timeout", "8")
+        config_manager.set("ui", "bot_name", "Set Bot")
+        
+        self.assertEqual(config_manager.get("app", "code_execution_timeout"), 8)
+        self.assertEqual(config_manager.get("ui", "bot_name"), "Set Bot")
+        with self.assertRaises(ValueError):
+            config_manager.set("app", "auto_save_code", "sometimes")
+        self.assertIs(config_manager.get("app", "auto_save_code"), True)
+    
+    def test_save_notifies_listeners(self):
+        """Test that save listeners run after the new values are visible."""
+        config_manager = ConfigManager(self.config_file)
+        seen = []
+        config_manager.add_save_listener(lambda: seen.append(config_manager.get("app", "auto_save_code")))
+        
+        config_manager.config["app"]["auto_save_code"] = False
+        config_manager.save()
+        self.assertEqual(seen, [False])
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from unittest import mock
+from conversation.conversation_manager import ConversationManager
+from conversation.advanced_context_manager import AdvancedContextManager
+from conversation.conversation_hub import ConversationHub
+
+class TestConversationHub(unittest.TestCase):
+    """Test cases for the ConversationHub class."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.conversation_manager = ConversationManager(max_turns=5)
+        self.advanced_context_manager = AdvancedContextManager()
+        self.hub = ConversationHub(self.conversation_manager, self.advanced_context_manager)
+    
+    def test_matches_separate_managers(self):
+        """Test that the hub records the same state as adding to each manager."""
+        conversation_manager = ConversationManager(max_turns=5)
+        advanced_context_manager = AdvancedContextManager()
+        messages = [
+            ("user", "How do I print?\n```python\nprint('question')\n```"),
+            ("assistant", "Like this:\n```\nx = 1\n```\n```python\nprint('hi')\n```"),
+            ("assistant", "Indented:\n\n    total = 0\n    print(total)\n"),
+        ]
+        for role, content in messages:
+            self.hub.add_message(role, content)
+            conversation_manager.add_message(role, content)
+            advanced_context_manager.add_message(role, content)
+        
+        self.assertEqual(self.conversation_manager.get_messages(), conversation_manager.get_messages())
+        self.assertEqual(self.conversation_manager.get_code_snippets(), ["print('hi')"])
+        self.assertEqual(
+            [m.get("code_snippets") for m in self.advanced_context_manager.messages],
+            [m.get("code_snippets") for m in advanced_context_manager.messages]
+        )
+        self.assertEqual(
+            list(self.advanced_context_manager.code_references),
+            list(advanced_context_manager.code_references)
+        )
+    
+    def test_message_is_parsed_once(self):
+        """Test that neither manager re-extracts code from hub messages."""
+        with mock.patch.object(ConversationManager, "_extract_code") as cm_extract, \
+                mock.patch.object(AdvancedContextManager, "_extract_code") as acm_extract:
+            self.hub.add_message("assistant", "```python\nprint('hi')\n```")
+        
+        cm_extract.assert_not_called()
+        acm_extract.assert_not_called()
+        self.assertEqual(self.conversation_manager.get_latest_code(), "print('hi')")
+    
+    def test_python_block_matches_conversation_manager(self):
+        """Test that the hub finds the same python block as the conversation manager."""
+        conversation_manager = ConversationManager(max_turns=5)
+        content = "```\nls\n```python\nprint(1)\n```"
+        
+        self.hub.add_message("assistant", content)
+        conversation_manager.add_message("assistant", content)
+        
+        self.assertEqual(conversation_manager.get_latest_code(), "print(1)")
+        self.assertEqual(self.conversation_manager.get_latest_code(), "print(1)")
+
+if __name__ == '__main__':
+    unittest.main()
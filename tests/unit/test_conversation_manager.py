@@ -2,7 +2,7 @@ import unittest
 import tempfile
 import os
 import json
-from conversation.conversation_manager import ConversationManager
+from conversation.conversation_manager import ConversationManager, MSGSPEC_AVAILABLE, ARCHIVE_SUFFIX
 
 class TestConversationManager(unittest.TestCase):
     """Test cases for the ConversationManager class."""
@@ -133,6 +133,83 @@ class TestConversationManager(unittest.TestCase):
             # Clean up
             if os.path.exists(filename):
                 os.unlink(filename)
+    
+    def test_export_import_non_ascii(self):
+        """Test that non-ASCII content survives an export/import round trip."""
+        self.conversation_manager.add_message("user", "Café ☕ — 你好")
+        
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.json') as temp_file:
+            filename = temp_file.name
+        
+        try:
+            self.assertTrue(self.conversation_manager.export_to_file(filename))
+            
+            new_manager = ConversationManager()
+            self.assertTrue(new_manager.import_from_file(filename))
+            self.assertEqual(new_manager.get_messages(), self.conversation_manager.get_messages())
+        finally:
+            if os.path.exists(filename):
+                os.unlink(filename)
+    
+    @unittest.skipUnless(MSGSPEC_AVAILABLE, "msgspec is not installed")
+    def test_export_import_msgpack(self):
+        """Test exporting and importing conversation history as MessagePack."""
+        self.conversation_manager.add_message("user", "Hello")
+        self.conversation_manager.add_message(
+            "assistant", 
+            "Hi! Here's some code:\n```python\nprint('Test')\n```"
+        )
+        
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.msgpack') as temp_file:
+            filename = temp_file.name
+        
+        try:
+            self.assertTrue(self.conversation_manager.export_to_file(filename))
+            
+            new_manager = ConversationManager()
+            self.assertTrue(new_manager.import_from_file(filename))
+            self.assertEqual(new_manager.get_messages(), self.conversation_manager.get_messages())
+            self.assertEqual(new_manager.get_code_snippets(), ["print('Test')"])
+        finally:
+            if os.path.exists(filename):
+                os.unlink(filename)
+    
+    def test_code_snippets_follow_evicted_messages(self):
+        """Test that snippets are dropped along with their evicted messages."""
+        manager = ConversationManager(max_turns=1)
+        manager.add_message("assistant", "```python\nprint('old')\n```")
+        manager.add_message("user", "Another one?")
+        manager.add_message("assistant", "```python\nprint('new')\n```")
+        
+        self.assertEqual(manager.get_code_snippets(), ["print('new')"])
+        self.assertEqual(manager.get_latest_code(), "print('new')")
+        
+        manager.add_message("user", "Thanks")
+        manager.add_message("assistant", "You're welcome!")
+        self.assertEqual(manager.get_code_snippets(), [])
+        self.assertIsNone(manager.get_latest_code())
+    
+    @unittest.skipUnless(MSGSPEC_AVAILABLE, "msgspec is not installed")
+    def test_export_import_archive(self):
+        """Test that archive imports only keep the messages that fit in the history."""
+        manager = ConversationManager(max_turns=200)
+        for i in range(200):
+            manager.add_message("user", f"Question {i}")
+            manager.add_message("assistant", f"Answer {i}:\n```python\nprint({i})\n```")
+        
+        with tempfile.NamedTemporaryFile(delete=False, suffix=ARCHIVE_SUFFIX) as temp_file:
+            filename = temp_file.name
+        
+        try:
+            self.assertTrue(manager.export_to_file(filename))
+            
+            new_manager = ConversationManager(max_turns=5)
+            self.assertTrue(new_manager.import_from_file(filename))
+            self.assertEqual(new_manager.get_messages(), manager.get_messages()[-10:])
+            self.assertEqual(new_manager.get_latest_code(), "print(199)")
+        finally:
+            if os.path.exists(filename):
+                os.unlink(filename)
 
 if __name__ == '__main__':
     unittest.main()
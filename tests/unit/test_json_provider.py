@@ -0,0 +1,52 @@
+import json
+import unittest
+from unittest import mock
+from flask import Flask, request, jsonify
+from ui.web import json_provider
+from ui.web.json_provider import ORJSONProvider
+
+class TestORJSONProvider(unittest.TestCase):
+    """Test cases for the ORJSONProvider class."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.app = Flask(__name__)
+        self.app.json = ORJSONProvider(self.app)
+        
+        @self.app.route('/echo', methods=['POST'])
+        def echo():
+            return jsonify({'received': request.json, 'status': 'ok'})
+        
+        self.client = self.app.test_client()
+    
+    def test_round_trip(self):
+        """Test that request bodies are parsed and responses serialized."""
+        payload = {'message': 'Café ☕', 'count': 3}
+        response = self.client.post('/echo', json=payload)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(json.loads(response.data), {'received': payload, 'status': 'ok'})
+    
+    def test_stdlib_fallback(self):
+        """Test that the provider works without orjson installed."""
+        with mock.patch.object(json_provider, "ORJSON_AVAILABLE", False):
+            response = self.client.post('/echo', json={'message': 'Hello'})
+        
+        self.assertEqual(json.loads(response.data), {'received': {'message': 'Hello'}, 'status': 'ok'})
+    
+    def test_stream_writes_one_document_per_line(self):
+        """Test that streamed responses are newline-delimited JSON."""
+        items = [{'role': 'user', 'content': 'Hi'}, {'role': 'assistant', 'content': 'Café ☕'}]
+        
+        for available in (True, False):
+            with mock.patch.object(json_provider, "ORJSON_AVAILABLE", available and json_provider.ORJSON_AVAILABLE):
+                with self.app.test_request_context():
+                    response = self.app.json.stream(items)
+                    lines = b"".join(response.response).splitlines()
+            
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            self.assertEqual([json.loads(line) for line in lines], items)
+
+if __name__ == '__main__':
+    unittest.main()
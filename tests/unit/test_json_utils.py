@@ -0,0 +1,39 @@
+import json
+import unittest
+from unittest import mock
+from utils import json_utils
+from utils.json_utils import json_dumps, json_loads
+
+class TestJsonUtils(unittest.TestCase):
+    """Test cases for the JSON utility helpers."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.payload = {"b": [1, 2.5, None], "a": "café"}
+    
+    def test_round_trip(self):
+        """Test that serialized payloads load back unchanged."""
+        data = json_dumps(self.payload)
+        self.assertIsInstance(data, bytes)
+        self.assertEqual(json_loads(data), self.payload)
+    
+    def test_sorted_output_matches_stdlib_fallback(self):
+        """Test that sorted output is identical with and without orjson."""
+        expected = json.dumps(self.payload, sort_keys=True, ensure_ascii=False,
+                              separators=(',', ':')).encode('utf-8')
+        
+        self.assertEqual(json_dumps(self.payload, sort_keys=True), expected)
+        with mock.patch.object(json_utils, "ORJSON_AVAILABLE", False):
+            self.assertEqual(json_dumps(self.payload, sort_keys=True), expected)
+            self.assertEqual(json_loads(expected), self.payload)
+    
+    def test_indented_output_matches_stdlib_fallback(self):
+        """Test that indented output is identical with and without orjson."""
+        expected = json.dumps(self.payload, indent=2, ensure_ascii=False).encode('utf-8')
+        
+        self.assertEqual(json_dumps(self.payload, indent=True), expected)
+        with mock.patch.object(json_utils, "ORJSON_AVAILABLE", False):
+            self.assertEqual(json_dumps(self.payload, indent=True), expected)
+
+if __name__ == '__main__':
+    unittest.main()
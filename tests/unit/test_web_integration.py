@@ -0,0 +1,113 @@
+import io
+import json
+import unittest
+from unittest import mock
+from flask import Flask
+from ui.web.web_integration import WebIntegration
+
+class StubConfigManager:
+    """Configuration manager backed by a plain dict."""
+    
+    def __init__(self, values):
+        self.values = values
+        self.listeners = []
+    
+    def get(self, section, key, default=None):
+        return self.values.get((section, key), default)
+    
+    def add_save_listener(self, listener):
+        self.listeners.append(listener)
+    
+    def save(self):
+        for listener in self.listeners:
+            listener()
+
+class TestWebIntegration(unittest.TestCase):
+    """Test cases for the WebIntegration class."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.config_manager = StubConfigManager({("app", "auto_save_code"): False})
+        self.code_executor = mock.MagicMock()
+        self.code_executor.execute_code.return_value = ("hi\n", "", True)
+        self.code_manager = mock.MagicMock()
+        self.code_manager.save_code.return_value = "bot_outputs/general/code.py"
+        self.code_categorizer = mock.MagicMock()
+        self.code_categorizer.categorize.return_value = ("general", 0.9, {})
+        
+        self.app = Flask(__name__)
+        self.app.secret_key = "test"
+        self.integration = WebIntegration(
+            self.app, self.config_manager, mock.MagicMock(), mock.MagicMock(), mock.MagicMock(),
+            self.code_executor, self.code_manager, self.code_categorizer
+        )
+        self.client = self.app.test_client()
+    
+    def test_execute_follows_saved_auto_save(self):
+        """Test that the execute handler is rebound when the configuration is saved."""
+        response = self.client.post('/api/execute', json={'code': "print('hi')"})
+        self.assertIsNone(response.get_json()['saved_path'])
+        self.code_manager.save_code.assert_not_called()
+        
+        self.config_manager.values[("app", "auto_save_code")] = True
+        self.config_manager.save()
+        
+        response = self.client.post('/api/execute', json={'code': "print('hi')"})
+        self.assertEqual(response.get_json()['saved_path'], "bot_outputs/general/code.py")
+        self.code_manager.save_code.assert_called_once_with("print('hi')", "general")
+    
+    def test_chat_stores_raw_session_id(self):
+        """Test that the chat endpoint stores a 16-byte session id."""
+        self.integration.api_client.get_completion.return_value = "Hello!"
+        self.code_manager.detect_and_extract.return_value = []
+        
+        response = self.client.post('/api/chat', json={'message': 'Hi'})
+        self.assertEqual(response.get_json(), {'response': 'Hello!', 'code_snippets': []})
+        
+        with self.client.session_transaction() as sess:
+            self.assertIsInstance(sess['session_id'], bytes)
+            self.assertEqual(len(sess['session_id']), 16)
+    
+    def test_empty_and_oversized_bodies_are_rejected(self):
+        """Test that empty bodies are rejected without parsing and large ones are capped."""
+        with mock.patch.object(self.app.json, "loads") as loads:
+            response = self.client.post('/api/chat', data=b'', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {'error': 'No message provided'})
+        loads.assert_not_called()
+        
+        response = self.client.post('/api/execute', data=b'', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        
+        body = b'{"code": "' + b'x' * self.app.config['MAX_CONTENT_LENGTH'] + b'"}'
+        response = self.client.post('/api/execute', data=body, content_type='application/json')
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.get_json(), {'error': 'Request body too large'})
+        self.code_executor.execute_code.assert_not_called()
+    
+    def test_chunked_body_without_content_length_is_accepted(self):
+        """Test that chunked requests, which carry no Content-Length, are parsed."""
+        response = self.client.post(
+            '/api/execute',
+            input_stream=io.BytesIO(b'{"code": "print(1)"}'),
+            headers={'Content-Type': 'application/json', 'Transfer-Encoding': 'chunked'},
+            environ_overrides={'wsgi.input_terminated': True}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.code_executor.execute_code.assert_called_once_with("print(1)")
+    
+    def test_history_stream_flag_is_boolean(self):
+        """Test that a false stream flag returns the JSON history body."""
+        messages = [{'role': 'user', 'content': 'Hi'}]
+        self.integration.conversation_manager.get_messages.return_value = messages
+        
+        for flag in ('0', 'false', 'no'):
+            response = self.client.get('/api/history?stream=' + flag)
+            self.assertEqual(response.get_json(), {'messages': messages})
+        
+        response = self.client.get('/api/history?stream=true')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], messages)
+
+if __name__ == '__main__':
+    unittest.main()
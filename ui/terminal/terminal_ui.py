@@ -5,7 +5,10 @@ This module provides a terminal-based user interface for the chatbot.
 """
 
 import os
+import re
+import sys
 import time
+import functools
 from typing import Callable, Optional
 
 # Try importing optional dependencies with fallbacks
@@ -15,16 +18,39 @@ try:
     from rich.panel import Panel
     from rich.markdown import Markdown
     from rich.progress import Progress, SpinnerColumn, TextColumn
+    from rich.segment import Segments
+    from rich.text import Text
     RICH_AVAILABLE = True
 except ImportError:
     RICH_AVAILABLE = False
-    try:
-        from termcolor import cprint, colored
-    except ImportError:
-        def cprint(text, color=None, **kwargs):
-            print(text)
-        def colored(text, color=None, **kwargs):
-            return text
+
+# Plain-terminal output, also used when Rich is installed but disabled in config
+try:
+    from termcolor import cprint, colored
+except ImportError:
+    def cprint(text, color=None, **kwargs):
+        print(text)
+    def colored(text, color=None, **kwargs):
+        return text
+
+# Fenced markdown code block: optional language tag, then the code
+_CODE_BLOCK_RE = re.compile(r"```(\w*)\n?(.*?)```", re.DOTALL)
+
+@functools.lru_cache(maxsize=None)
+def _get_console():
+    """Return the console shared by all TerminalUI instances."""
+    return Console()
+
+@functools.lru_cache(maxsize=128)
+def _render_code(console, code: str, lexer: str, width: int):
+    """
+    Render a highlighted code panel once and cache the resulting segments.
+    
+    Syntax highlights lazily at print time, so caching the rendered segments
+    (keyed by terminal width) is what lets repeated snippets skip Pygments.
+    """
+    panel = Panel(Syntax(code, lexer, theme="monokai", line_numbers=True))
+    return Segments(list(console.render(panel, console.options.update_width(width))))
 
 class TerminalUI:
     """Provides a terminal-based user interface for the chatbot."""
@@ -35,64 +61,81 @@ class TerminalUI:
         self.use_rich = RICH_AVAILABLE and self.config_manager.get("ui", "use_rich_ui", True)
         
         if self.use_rich:
-            self.console = Console()
+            self.console = _get_console()
         
         self.bot_name = self.config_manager.get("ui", "bot_name", "Advanced Python Assistant")
         self.primary_color = self.config_manager.get("ui", "primary_color", "cyan")
         self.secondary_color = self.config_manager.get("ui", "secondary_color", "green")
         self.error_color = self.config_manager.get("ui", "error_color", "red")
         self.success_color = self.config_manager.get("ui", "success_color", "magenta")
+        # Optional cosmetic pause for display_thinking without a callback
+        self.thinking_delay = self.config_manager.get("ui", "thinking_delay_ms", 0) / 1000
+        
+        # Styles derived from the configured colors, formatted once
+        self._title_style = f"bold {self.primary_color}"
+        self._input_style = f"bold {self.secondary_color}"
+        self._error_style = f"bold {self.error_color}"
+        self._error_panel_style = f"on {self.error_color}"
+        self._success_style = f"bold {self.success_color}"
+        
+        # Message prefix and its style (or pre-colored prefix without Rich), keyed by is_user
+        self._role_style = {
+            True: self._prefix_style("You: ", self.secondary_color),
+            False: self._prefix_style(f"{self.bot_name}: ", self.primary_color),
+        }
+    
+    def _prefix_style(self, prefix: str, color: str):
+        """Return the (prefix, style) pair used to print a message prefix."""
+        if self.use_rich:
+            return prefix, f"bold {color}"
+        return colored(prefix, color, attrs=['bold']), None
     
     def display_welcome(self):
         """Display welcome message."""
         if self.use_rich:
-            self.console.print(f"[bold {self.primary_color}]{self.bot_name}[/bold {self.primary_color}]")
-            self.console.print("[dim]Type your Python questions or 'exit' to quit.[/dim]")
+            # Plain strings are printed with a style to skip markup parsing and highlighting
+            self.console.print(self.bot_name, style=self._title_style, markup=False, highlight=False)
+            self.console.print("Type your Python questions or 'exit' to quit.", style="dim", markup=False, highlight=False)
         else:
             cprint(self.bot_name, self.primary_color, attrs=['bold'])
             print("Type your Python questions or 'exit' to quit.")
     
     def display_message(self, message: str, is_user: bool = False):
         """Display a message in the terminal."""
-        if is_user:
-            prefix = "You: "
-            color = self.secondary_color
-        else:
-            prefix = f"{self.bot_name}: "
-            color = self.primary_color
+        prefix, style = self._role_style[is_user]
         
         if self.use_rich:
-            self.console.print(f"[bold {color}]{prefix}[/bold {color}]", end="")
+            console = self.console
+            console.print(prefix, style=style, end="", markup=False, highlight=False)
             
-            # Check if message contains code blocks for special formatting
-            if "```python" in message and "```" in message:
-                # Split by code blocks
-                parts = message.split("```")
-                for i, part in enumerate(parts):
-                    if i % 2 == 0:  # Regular text
-                        if part.strip():
-                            self.console.print(part)
-                    else:  # Code block
-                        if part.startswith("python"):
-                            code = part[6:].strip()  # Remove "python" prefix
-                        else:
-                            code = part.strip()
-                        
-                        if code:
-                            syntax = Syntax(code, "python", theme="monokai", line_numbers=True)
-                            self.console.print(Panel(syntax))
-            else:
-                # Regular message without code blocks
-                self.console.print(message)
+            # Walk code blocks in a single pass, printing the text between them
+            last_end = 0
+            width = console.width
+            for match in _CODE_BLOCK_RE.finditer(message):
+                text = message[last_end:match.start()]
+                if text.strip():
+                    console.print(text)
+                
+                code = match.group(2).strip()
+                if code:
+                    lexer = match.group(1) or "python"
+                    console.print(_render_code(console, code, lexer, width))
+                last_end = match.end()
+            
+            # Regular message without code blocks, or text after the last block
+            if last_end == 0:
+                console.print(message)
+            elif message[last_end:].strip():
+                console.print(message[last_end:])
         else:
-            print(colored(prefix, color, attrs=['bold']), end="")
+            print(prefix, end="")
             print(message)
     
     def display_code_execution_result(self, output: str, error: str, success: bool):
         """Display code execution result."""
         if output:
             if self.use_rich:
-                self.console.print("\n[bold]Output:[/bold]")
+                self.console.print("\nOutput:", style="bold", markup=False, highlight=False)
                 self.console.print(Panel(output))
             else:
                 print("\nOutput:")
@@ -101,22 +144,22 @@ class TerminalUI:
         if error:
             color = self.error_color
             if self.use_rich:
-                self.console.print(f"\n[bold {color}]Error:[/bold {color}]")
-                self.console.print(Panel(error, style=f"on {color}"))
+                self.console.print("\nError:", style=self._error_style, markup=False, highlight=False)
+                self.console.print(Panel(error, style=self._error_panel_style))
             else:
                 print(colored("\nError:", color, attrs=['bold']))
                 print(colored(error, color))
         
         if success and not error:
             if self.use_rich:
-                self.console.print(f"\n[{self.success_color}]Code executed successfully![/{self.success_color}]")
+                self.console.print("\nCode executed successfully!", style=self.success_color, markup=False, highlight=False)
             else:
                 cprint("\nCode executed successfully!", self.success_color)
     
     def get_user_input(self) -> str:
         """Get input from the user."""
         if self.use_rich:
-            self.console.print(f"\n[bold {self.secondary_color}]You:[/bold {self.secondary_color}] ", end="")
+            self.console.print("\nYou: ", style=self._input_style, end="", markup=False, highlight=False)
             return input()
         else:
             return input(colored("\nYou: ", self.secondary_color, attrs=['bold']))
@@ -127,45 +170,55 @@ class TerminalUI:
         
         Args:
             callback: Optional function to call while thinking animation is running
+            
+        Returns:
+            The callback's return value, or None if no callback was given
         """
+        # Nothing to wait for unless a cosmetic delay is configured
+        if not callback and not self.thinking_delay:
+            return None
+        
         if self.use_rich:
             with Progress(
                 SpinnerColumn(),
-                TextColumn("[bold blue]Thinking...[/bold blue]"),
+                TextColumn("Thinking...", style="bold blue", markup=False),
                 transient=True,
             ) as progress:
                 task = progress.add_task("Thinking...", total=None)
-                
-                # If callback is provided, call it
-                if callback:
-                    callback()
-                else:
-                    # Otherwise, just wait a bit for visual effect
-                    time.sleep(2)
+                return self._wait_for(callback)
         else:
             print("Thinking...")
-            
-            # If callback is provided, call it
-            if callback:
-                callback()
-            else:
-                # Otherwise, just wait a bit for visual effect
-                time.sleep(2)
+            return self._wait_for(callback)
+    
+    def _wait_for(self, callback: Optional[Callable]):
+        """Call the callback, or pause for the configured thinking delay without one."""
+        if callback:
+            return callback()
+        time.sleep(self.thinking_delay)
+        return None
     
     def display_error(self, message: str):
         """Display an error message."""
         if self.use_rich:
-            self.console.print(f"[bold {self.error_color}]Error:[/bold {self.error_color}] {message}")
+            self.console.print(Text.assemble(("Error:", self._error_style), " ", message))
         else:
             cprint(f"Error: {message}", self.error_color)
     
     def display_success(self, message: str):
         """Display a success message."""
         if self.use_rich:
-            self.console.print(f"[bold {self.success_color}]{message}[/bold {self.success_color}]")
+            self.console.print(message, style=self._success_style, markup=False, highlight=False)
         else:
             cprint(message, self.success_color)
     
     def clear_screen(self):
         """Clear the terminal screen."""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        if self.use_rich:
+            self.console.clear()
+        elif os.name == 'nt':
+            # Classic Windows consoles may not interpret ANSI escape sequences
+            os.system('cls')
+        else:
+            # Erase the display and move the cursor home without spawning a shell
+            sys.stdout.write("\x1b[2J\x1b[H")
+            sys.stdout.flush()
@@ -0,0 +1,74 @@
+"""
+JSON Provider Module
+
+This module provides a Flask JSON provider that serializes request and
+response bodies with orjson when it is installed.
+"""
+
+from typing import Any, Iterable, Iterator
+from flask import jsonify
+from flask.json.provider import DefaultJSONProvider
+
+# Try importing optional dependencies with fallbacks
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Largest request body accepted by the API endpoints (Flask answers 413 above it)
+MAX_CONTENT_LENGTH = 1024 * 1024
+
+def request_too_large(error):
+    """Answer oversized requests with the API's JSON error shape instead of an HTML page."""
+    return jsonify({'error': 'Request body too large'}), 413
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, falling back to the stdlib provider."""
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize data as a JSON string."""
+        if not ORJSON_AVAILABLE or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode('utf-8')
+    
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        """Deserialize JSON from a string or bytes."""
+        if not ORJSON_AVAILABLE or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args: Any, **kwargs: Any):
+        """Serialize the arguments as JSON and return a response object."""
+        if not ORJSON_AVAILABLE or self.compact is False or (self.compact is None and self._app.debug):
+            # Keep the stdlib's pretty-printed output for debugging
+            return super().response(*args, **kwargs)
+        
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+    
+    def stream(self, items: Iterable[Any]):
+        """
+        Return a streaming response with one JSON document per line (NDJSON).
+        
+        Items are serialized as the response is sent, so the full body is
+        never built in memory.
+        """
+        return self._app.response_class(self._iter_lines(items), mimetype="application/x-ndjson")
+    
+    def _iter_lines(self, items: Iterable[Any]) -> Iterator[bytes]:
+        """Serialize each item as a newline-terminated JSON document."""
+        if not ORJSON_AVAILABLE:
+            for item in items:
+                yield (super().dumps(item) + "\n").encode('utf-8')
+            return
+        
+        for item in items:
+            yield self._dumps_bytes(item, orjson.OPT_APPEND_NEWLINE)
+    
+    def _dumps_bytes(self, obj: Any, option: int = 0) -> bytes:
+        """Serialize data to JSON bytes with orjson."""
+        option |= orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option)
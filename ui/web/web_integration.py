@@ -7,8 +7,10 @@ the backend components of the Python Bot.
 
 import os
 import json
+import functools
 from flask import Flask, render_template, request, jsonify, session
-import uuid
+from ui.web.json_provider import ORJSONProvider, MAX_CONTENT_LENGTH, request_too_large
+from conversation.conversation_hub import ConversationHub
 
 class WebIntegration:
     """Handles integration between web UI and backend components."""
@@ -37,134 +39,174 @@ class WebIntegration:
         self.code_manager = code_manager
         self.code_categorizer = code_categorizer
         
+        # Records each message in both managers with a single code parse
+        self.hub = ConversationHub(conversation_manager, advanced_context_manager)
+        
+        # Serialize API requests and responses with orjson when available
+        self.app.json = ORJSONProvider(self.app)
+        # Cap request bodies unless the application already set a limit
+        if self.app.config.get('MAX_CONTENT_LENGTH') is None:
+            self.app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+        
         # Register routes
         self._register_routes()
+        # Rebind configuration-dependent handlers whenever the config is saved
+        self.config_manager.add_save_listener(self.reload_config)
     
     def _register_routes(self):
         """Register Flask routes for API endpoints."""
+        self.app.add_url_rule('/api/chat', 'chat', self._chat, methods=['POST'])
+        # Bound to the current auto-save setting; see reload_config()
+        self.app.add_url_rule(
+            '/api/execute', 'execute_code',
+            self._make_execute_handler(self.config_manager.get("app", "auto_save_code", True)),
+            methods=['POST']
+        )
+        self.app.add_url_rule('/api/history', 'get_history', self._get_history, methods=['GET'])
+        self.app.add_url_rule('/api/clear', 'clear_history', self._clear_history, methods=['POST'])
+        self.app.add_url_rule('/api/categorize', 'categorize_code', self._categorize_code, methods=['POST'])
+        self.app.add_url_rule('/api/context', 'get_relevant_context', self._get_relevant_context, methods=['POST'])
+        self.app.register_error_handler(413, request_too_large)
+    
+    def _chat(self):
+        """Handle chat API endpoint."""
+        # Reject empty bodies before parsing any JSON; the body is read
+        # rather than trusting Content-Length, which chunked requests lack
+        if not request.get_data():
+            return jsonify({'error': 'No message provided'}), 400
         
-        @self.app.route('/api/chat', methods=['POST'])
-        def chat():
-            """Handle chat API endpoint."""
-            data = request.json
-            user_message = data.get('message', '')
-            
-            if not user_message:
-                return jsonify({'error': 'No message provided'}), 400
-            
-            # Initialize session if needed
-            if 'session_id' not in session:
-                session['session_id'] = str(uuid.uuid4())
-            
-            # Add user message to conversation managers
-            self.conversation_manager.add_message("user", user_message)
-            self.advanced_context_manager.add_message("user", user_message)
-            
-            # Get optimized context for API request
-            context = self.advanced_context_manager.get_optimized_context()
-            
-            # Get response from API
-            response = self.api_client.get_completion(context)
-            
-            # Add assistant response to conversation managers
-            self.conversation_manager.add_message("assistant", response)
-            self.advanced_context_manager.add_message("assistant", response)
-            
-            # Check if response contains code
-            code_snippets = []
-            if self.code_manager.detect_code(response):
-                code = self.code_manager.extract_code(response)
-                if code:
-                    code_snippets.append(code)
-                    
-                    # Categorize code if present
-                    if code:
-                        category, confidence, _ = self.code_categorizer.categorize(code)
-                        code_info = {
-                            'code': code,
-                            'category': category,
-                            'confidence': confidence
-                        }
-                        code_snippets = [code_info]
-            
-            return jsonify({
-                'response': response,
-                'code_snippets': code_snippets
-            })
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'No message provided'}), 400
+        user_message = data.get('message', '')
         
-        @self.app.route('/api/execute', methods=['POST'])
-        def execute_code():
-            """Handle code execution API endpoint."""
-            data = request.json
-            code = data.get('code', '')
-            
-            if not code:
-                return jsonify({'error': 'No code provided'}), 400
-            
-            # Execute code
-            output, error, success = self.code_executor.execute_code(code)
-            
-            # Save code if successful and auto-save is enabled
-            saved_path = None
-            category = None
-            if success and self.config_manager.get("app", "auto_save_code", True):
-                # Use advanced categorization
-                category, confidence, _ = self.code_categorizer.categorize(code)
-                if confidence < 0.5:
-                    category = "general"
-                    
-                saved_path = self.code_manager.save_code(code, category)
-            
-            return jsonify({
-                'output': output,
-                'error': error,
-                'success': success,
-                'saved_path': saved_path,
-                'category': category
-            })
+        if not user_message:
+            return jsonify({'error': 'No message provided'}), 400
+        
+        # Initialize session if needed
+        if 'session_id' not in session:
+            session['session_id'] = os.urandom(16)  # Raw bytes; no UUID formatting needed
+        
+        # Add user message to conversation managers
+        self.hub.add_message("user", user_message)
+        
+        # Get optimized context for API request
+        context = self.advanced_context_manager.get_optimized_context()
         
-        @self.app.route('/api/history', methods=['GET'])
-        def get_history():
-            """Get conversation history."""
-            messages = self.conversation_manager.get_messages()
-            return jsonify({'messages': messages})
-        
-        @self.app.route('/api/clear', methods=['POST'])
-        def clear_history():
-            """Clear conversation history."""
-            self.conversation_manager.clear()
-            self.advanced_context_manager = self.advanced_context_manager.__class__()
-            return jsonify({'success': True})
-        
-        @self.app.route('/api/categorize', methods=['POST'])
-        def categorize_code():
-            """Categorize code snippet."""
-            data = request.json
-            code = data.get('code', '')
-            
-            if not code:
-                return jsonify({'error': 'No code provided'}), 400
-            
-            # Get category suggestions
-            suggestions = self.code_categorizer.get_category_suggestions(code, top_n=3)
-            
-            return jsonify({
-                'suggestions': [
-                    {'category': category, 'confidence': confidence}
-                    for category, confidence in suggestions
-                ]
+        # Get response from API
+        response = self.api_client.get_completion(context)
+        
+        # Add assistant response to conversation managers
+        self.hub.add_message("assistant", response)
+        
+        # Check if response contains code
+        code_snippets = []
+        for code in self.code_manager.detect_and_extract(response):
+            # Categorize code if present
+            category, confidence, _ = self.code_categorizer.categorize(code)
+            code_snippets.append({
+                'code': code,
+                'category': category,
+                'confidence': confidence
             })
         
-        @self.app.route('/api/context', methods=['POST'])
-        def get_relevant_context():
-            """Get context relevant to a query."""
-            data = request.json
-            query = data.get('query', '')
-            
-            if not query:
-                return jsonify({'error': 'No query provided'}), 400
-            
-            # Get relevant context
-            context = self.advanced_context_manager.get_relevant_context(query)
-            
-            return jsonify({'context': context})
+        return jsonify({
+            'response': response,
+            'code_snippets': code_snippets
+        })
+    
+    def _execute_code(self, auto_save: bool):
+        """Handle code execution API endpoint, saving successful code if auto_save is set."""
+        # Reject empty bodies before parsing any JSON; the body is read
+        # rather than trusting Content-Length, which chunked requests lack
+        if not request.get_data():
+            return jsonify({'error': 'No code provided'}), 400
+        
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'No code provided'}), 400
+        code = data.get('code', '')
+        
+        if not code:
+            return jsonify({'error': 'No code provided'}), 400
+        
+        # Execute code
+        output, error, success = self.code_executor.execute_code(code)
+        
+        # Save code if successful and auto-save is enabled
+        saved_path = None
+        category = None
+        if success and auto_save:
+            # Use advanced categorization
+            category, confidence, _ = self.code_categorizer.categorize(code)
+            if confidence < 0.5:
+                category = "general"
+                
+            saved_path = self.code_manager.save_code(code, category)
+        
+        return jsonify({
+            'output': output,
+            'error': error,
+            'success': success,
+            'saved_path': saved_path,
+            'category': category
+        })
+    
+    def _get_history(self):
+        """Get conversation history, as NDJSON lines when ?stream=1 is given."""
+        messages = self.conversation_manager.get_messages()
+        if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+            return self.app.json.stream(messages)
+        return jsonify({'messages': messages})
+    
+    def _clear_history(self):
+        """Clear conversation history."""
+        self.conversation_manager.clear()
+        self.advanced_context_manager.reset()
+        return jsonify({'success': True})
+    
+    def _categorize_code(self):
+        """Categorize code snippet."""
+        data = request.json
+        code = data.get('code', '')
+        
+        if not code:
+            return jsonify({'error': 'No code provided'}), 400
+        
+        # Get category suggestions
+        suggestions = self.code_categorizer.get_category_suggestions(code, top_n=3)
+        
+        return jsonify({
+            'suggestions': [
+                {'category': category, 'confidence': confidence}
+                for category, confidence in suggestions
+            ]
+        })
+    
+    def _get_relevant_context(self):
+        """Get context relevant to a query."""
+        data = request.json
+        query = data.get('query', '')
+        
+        if not query:
+            return jsonify({'error': 'No query provided'}), 400
+        
+        # Get relevant context
+        context = self.advanced_context_manager.get_relevant_context(query)
+        
+        return jsonify({'context': context})
+    
+    def reload_config(self):
+        """Rebind configuration-dependent handlers after the configuration changes."""
+        self.app.view_functions['execute_code'] = self._make_execute_handler(
+            self.config_manager.get("app", "auto_save_code", True)
+        )
+    
+    def _make_execute_handler(self, auto_save: bool):
+        """
+        Build the code execution handler for a fixed auto-save setting.
+        
+        Args:
+            auto_save: Whether successfully executed code is saved
+        """
+        return functools.partial(self._execute_code, auto_save)
@@ -6,8 +6,8 @@ This module provides a web-based user interface for the chatbot.
 
 from flask import Flask, render_template, request, jsonify, session
 import os
-import uuid
 from typing import Dict, Any
+from ui.web.json_provider import ORJSONProvider, MAX_CONTENT_LENGTH, request_too_large
 
 class WebUI:
     """Provides a web-based user interface for the chatbot."""
@@ -25,90 +25,105 @@ class WebUI:
                          template_folder=os.path.join(os.path.dirname(__file__), 'templates'),
                          static_folder=os.path.join(os.path.dirname(__file__), 'static'))
         self.app.secret_key = os.urandom(24)
+        self.app.json = ORJSONProvider(self.app)
+        self.app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
         
         # Register routes
         self._register_routes()
     
     def _register_routes(self):
         """Register Flask routes."""
+        self.app.add_url_rule('/', 'index', self._index)
+        self.app.add_url_rule('/api/chat', 'chat', self._chat, methods=['POST'])
+        self.app.add_url_rule('/api/execute', 'execute_code', self._execute_code, methods=['POST'])
+        self.app.add_url_rule('/api/history', 'get_history', self._get_history, methods=['GET'])
+        self.app.add_url_rule('/api/clear', 'clear_history', self._clear_history, methods=['POST'])
+        self.app.register_error_handler(413, request_too_large)
+    
+    def _index(self):
+        """Render the main page."""
+        # Initialize session if needed
+        if 'session_id' not in session:
+            session['session_id'] = os.urandom(16)  # Raw bytes; no UUID formatting needed
+        
+        bot_name = self.config_manager.get("ui", "bot_name", "Advanced Python Assistant")
+        return render_template('index.html', bot_name=bot_name)
+    
+    def _chat(self):
+        """Handle chat API endpoint."""
+        # Reject empty bodies before parsing any JSON; the body is read
+        # rather than trusting Content-Length, which chunked requests lack
+        if not request.get_data():
+            return jsonify({'error': 'No message provided'}), 400
+        
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'No message provided'}), 400
+        user_message = data.get('message', '')
         
-        @self.app.route('/')
-        def index():
-            """Render the main page."""
-            # Initialize session if needed
-            if 'session_id' not in session:
-                session['session_id'] = str(uuid.uuid4())
-            
-            bot_name = self.config_manager.get("ui", "bot_name", "Advanced Python Assistant")
-            return render_template('index.html', bot_name=bot_name)
+        if not user_message:
+            return jsonify({'error': 'No message provided'}), 400
         
-        @self.app.route('/api/chat', methods=['POST'])
-        def chat():
-            """Handle chat API endpoint."""
-            data = request.json
-            user_message = data.get('message', '')
-            
-            if not user_message:
-                return jsonify({'error': 'No message provided'}), 400
-            
-            # Add user message to conversation
-            self.conversation_manager.add_message("user", user_message)
-            
-            # Get response from API
-            messages = self.conversation_manager.get_messages()
-            response = self.api_client.get_completion(messages)
-            
-            # Add assistant response to conversation
-            self.conversation_manager.add_message("assistant", response)
-            
-            # Check if response contains code
-            code_snippets = []
-            if self.code_manager.detect_code(response):
-                code = self.code_manager.extract_code(response)
-                if code:
-                    code_snippets.append(code)
-            
-            return jsonify({
-                'response': response,
-                'code_snippets': code_snippets
-            })
+        # Add user message to conversation
+        self.conversation_manager.add_message("user", user_message)
         
-        @self.app.route('/api/execute', methods=['POST'])
-        def execute_code():
-            """Handle code execution API endpoint."""
-            data = request.json
-            code = data.get('code', '')
-            
-            if not code:
-                return jsonify({'error': 'No code provided'}), 400
-            
-            # Execute code
-            output, error, success = self.code_executor.execute_code(code)
-            
-            # Save code if successful and auto-save is enabled
-            saved_path = None
-            if success and self.config_manager.get("app", "auto_save_code", True):
-                category = self.code_manager.categorize_code(code)
-                saved_path = self.code_manager.save_code(code, category)
-            
-            return jsonify({
-                'output': output,
-                'error': error,
-                'success': success,
-                'saved_path': saved_path
-            })
+        # Get response from API
+        messages = self.conversation_manager.get_messages()
+        response = self.api_client.get_completion(messages)
         
-        @self.app.route('/api/history', methods=['GET'])
-        def get_history():
-            """Get conversation history."""
-            messages = self.conversation_manager.get_messages()
-            return jsonify({'messages': messages})
+        # Add assistant response to conversation
+        self.conversation_manager.add_message("assistant", response)
+        
+        # Check if response contains code
+        code_snippets = self.code_manager.detect_and_extract(response)
+        
+        return jsonify({
+            'response': response,
+            'code_snippets': code_snippets
+        })
+    
+    def _execute_code(self):
+        """Handle code execution API endpoint."""
+        # Reject empty bodies before parsing any JSON; the body is read
+        # rather than trusting Content-Length, which chunked requests lack
+        if not request.get_data():
+            return jsonify({'error': 'No code provided'}), 400
         
-        @self.app.route('/api/clear', methods=['POST'])
-        def clear_history():
-            """Clear conversation history."""
-            self.conversation_manager.clear()
-            return jsonify({'success': True})
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'No code provided'}), 400
+        code = data.get('code', '')
+        
+        if not code:
+            return jsonify({'error': 'No code provided'}), 400
+        
+        # Execute code
+        output, error, success = self.code_executor.execute_code(code)
+        
+        # Save code if successful and auto-save is enabled
+        saved_path = None
+        if success and self.config_manager.get("app", "auto_save_code", True):
+            category = self.code_manager.categorize_code(code)
+            saved_path = self.code_manager.save_code(code, category)
+        
+        return jsonify({
+            'output': output,
+            'error': error,
+            'success': success,
+            'saved_path': saved_path
+        })
+    
+    def _get_history(self):
+        """Get conversation history, as NDJSON lines when ?stream=1 is given."""
+        messages = self.conversation_manager.get_messages()
+        if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+            return self.app.json.stream(messages)
+        return jsonify({'messages': messages})
+    
+    def _clear_history(self):
+        """Clear conversation history."""
+        self.conversation_manager.clear()
+        return jsonify({'success': True})
     
     def run(self, host='0.0.0.0', port=5000, debug=False):
         """Run the Flask application."""
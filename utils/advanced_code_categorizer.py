@@ -7,12 +7,80 @@ including machine learning-inspired heuristics and pattern recognition.
 
 import re
 import os
+import operator
+from hashlib import blake2b
 from typing import Dict, List, Tuple, Set, Optional
-from collections import Counter
+from collections import Counter, OrderedDict
+
+# Try importing optional dependencies with fallbacks
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+# Top-level module named by an "import x" or "from x[.y] import" statement
+_IMPORT_RE = re.compile(r'\bimport\s+(\w+)|\bfrom\s+(\w+)(?:\.\w+)*\s+import\b')
+
+# Patterns used to normalize code before analysis
+_COMMENT_RE = re.compile(r'#.*$', re.MULTILINE)
+_TRIPLE_DOUBLE_RE = re.compile(r'""".*?"""', re.DOTALL)
+_TRIPLE_SINGLE_RE = re.compile(r"'''.*?'''", re.DOTALL)
+
+# Distinctive lowercase substrings that identify a category on their own
+_ANCHORS = {
+    "data_analysis": ("pandas", "matplotlib", "seaborn"),
+    "web_development": ("flask", "django", "fastapi", "@app.route"),
+    "machine_learning": ("sklearn", "tensorflow", "torch", "keras"),
+    "automation": ("selenium", "beautifulsoup", "scrapy"),
+    "database": ("sqlite3", "psycopg2", "pymongo", "sqlalchemy"),
+    "gui": ("tkinter", "pyqt", "pyside", "kivy"),
+}
+
+# Score added per keyword occurrence, by weight tier
+_TIER_WEIGHTS = {"high": 3, "medium": 2, "low": 1}
+
+# Anchor hits needed before a single anchored category skips full scoring
+_ANCHOR_THRESHOLD = 2
+
+def _combine_scores(
+    categories: Tuple[str, ...],
+    scores: Tuple[float, ...],
+    factors: Optional[Tuple[float, ...]],
+) -> Tuple[str, float, Dict[str, float]]:
+    """
+    Apply the history bias to weighted scores, pick the best category and normalize.
+    
+    All steps run through builtins over the fixed-order score tuples, so the
+    arithmetic stays in C instead of per-category Python loops.
+    """
+    # Apply history bias (slight preference for previously seen categories)
+    if factors is not None:
+        scores = list(map(operator.mul, scores, factors))
+    
+    # Get best category (the first one on ties) and confidence
+    best_score = max(scores)
+    best_category = categories[scores.index(best_score)]
+    
+    # Calculate confidence (normalize scores)
+    total_score = sum(scores)
+    if total_score > 0:
+        normalized_scores = dict(zip(categories, [score / total_score for score in scores]))
+        return best_category, best_score / total_score, normalized_scores
+    return best_category, 0.0, dict.fromkeys(categories, 0)
 
 class AdvancedCodeCategorizer:
     """Advanced code categorization using sophisticated heuristics and pattern recognition."""
     
+    # Maximum number of snippets whose weighted scores are kept in memory
+    SCORE_CACHE_SIZE = 512
+    
     def __init__(self):
         """Initialize the advanced code categorizer."""
         # Define category keywords with weights
@@ -69,42 +137,42 @@ class AdvancedCodeCategorizer:
             }
         }
         
-        # Define import patterns for better categorization
-        self.import_patterns = {
-            "data_analysis": [
-                r"import\s+(pandas|numpy|matplotlib|seaborn|plotly)",
-                r"from\s+(pandas|numpy|matplotlib|seaborn|plotly)(\.\w+)?\s+import"
-            ],
-            "web_development": [
-                r"import\s+(flask|django|fastapi|requests|aiohttp|tornado|bottle)",
-                r"from\s+(flask|django|fastapi|requests|aiohttp|tornado|bottle)(\.\w+)?\s+import"
-            ],
-            "machine_learning": [
-                r"import\s+(sklearn|tensorflow|keras|torch|xgboost)",
-                r"from\s+(sklearn|tensorflow|keras|torch|xgboost)(\.\w+)?\s+import"
-            ],
-            "automation": [
-                r"import\s+(selenium|bs4|scrapy|schedule)",
-                r"from\s+(selenium|bs4|scrapy|schedule)(\.\w+)?\s+import"
-            ],
-            "database": [
-                r"import\s+(sqlite3|mysql|psycopg2|pymongo|sqlalchemy)",
-                r"from\s+(sqlite3|mysql|psycopg2|pymongo|sqlalchemy)(\.\w+)?\s+import"
-            ],
-            "system": [
-                r"import\s+(os|sys|subprocess|platform|shutil)",
-                r"from\s+(os|sys|subprocess|platform|shutil)(\.\w+)?\s+import"
-            ],
-            "networking": [
-                r"import\s+(socket|http|urllib|requests)",
-                r"from\s+(socket|http|urllib|requests)(\.\w+)?\s+import"
-            ],
-            "gui": [
-                r"import\s+(tkinter|PyQt5|PySide2|kivy)",
-                r"from\s+(tkinter|PyQt5|PySide2|kivy)(\.\w+)?\s+import"
-            ]
+        # Map each lowercase keyword to the (category, weight) pairs it scores,
+        # so keywords shared between categories are only searched for once
+        self._keyword_weights = {}
+        for category, keyword_groups in self.category_keywords.items():
+            for tier, keywords in keyword_groups.items():
+                for keyword in keywords:
+                    self._keyword_weights.setdefault(keyword.lower(), []).append(
+                        (category, _TIER_WEIGHTS[tier])
+                    )
+        
+        # With pyahocorasick, all keywords are found in a single pass
+        self._keyword_automaton = None
+        if AHOCORASICK_AVAILABLE:
+            self._keyword_automaton = ahocorasick.Automaton()
+            for keyword, targets in self._keyword_weights.items():
+                self._keyword_automaton.add_word(keyword, (keyword, tuple(targets)))
+            self._keyword_automaton.make_automaton()
+        
+        # Define imported modules for better categorization (strongest signal)
+        self.import_modules = {
+            "data_analysis": ["pandas", "numpy", "matplotlib", "seaborn", "plotly"],
+            "web_development": ["flask", "django", "fastapi", "requests", "aiohttp", "tornado", "bottle"],
+            "machine_learning": ["sklearn", "tensorflow", "keras", "torch", "xgboost"],
+            "automation": ["selenium", "bs4", "scrapy", "schedule"],
+            "database": ["sqlite3", "mysql", "psycopg2", "pymongo", "sqlalchemy"],
+            "system": ["os", "sys", "subprocess", "platform", "shutil"],
+            "networking": ["socket", "http", "urllib", "requests"],
+            "gui": ["tkinter", "PyQt5", "PySide2", "kivy"]
         }
         
+        # Map each module to the categories it signals
+        self._module_categories = {}
+        for category, modules in self.import_modules.items():
+            for module in modules:
+                self._module_categories.setdefault(module, []).append(category)
+        
         # Define code structure patterns
         self.structure_patterns = {
             "data_analysis": [
@@ -141,8 +209,64 @@ class AdvancedCodeCategorizer:
             ]
         }
         
+        # All structure patterns fused into one alternation with a named group
+        # per category, so the code is scanned once instead of once per pattern
+        self._structure_re = re.compile("|".join(
+            f"(?P<{category}>{'|'.join(f'(?:{pattern})' for pattern in patterns)})"
+            for category, patterns in self.structure_patterns.items()
+        ))
+        # Category for each group number, holding the same (interned) key
+        # objects as the other tables; the group names from match.lastgroup
+        # are separate copies that only compare equal by content
+        self._structure_groups = [None] * (self._structure_re.groups + 1)
+        for category in self.structure_patterns:
+            self._structure_groups[self._structure_re.groupindex[category]] = category
+        
+        # With Hyperscan, the same patterns run as one DFA-based database;
+        # each pattern id maps back to its category
+        self._structure_db = None
+        if HYPERSCAN_AVAILABLE:
+            self._structure_ids = [
+                category
+                for category, patterns in self.structure_patterns.items()
+                for _ in patterns
+            ]
+            expressions = [
+                pattern.encode('ascii')
+                for patterns in self.structure_patterns.values()
+                for pattern in patterns
+            ]
+            self._structure_db = hyperscan.Database()
+            self._structure_db.compile(
+                expressions=expressions,
+                ids=list(range(len(expressions))),
+                elements=len(expressions),
+                flags=[0] * len(expressions)
+            )
+        
+        # Every lowercase substring that can produce a score: keywords, module
+        # names and the literal text of the structure patterns. Code without
+        # any of them cannot score, so it skips analysis entirely.
+        self._triggers = tuple(set(self._keyword_weights).union(
+            module.lower() for module in self._module_categories
+        ).union(
+            pattern.replace("\\", "").lower()
+            for patterns in self.structure_patterns.values()
+            for pattern in patterns
+        ))
+        
+        # Fixed category order for the score tuples built by _weighted_scores
+        self._categories = tuple(self.category_keywords)
+        
+        # Weighted scores before history bias, keyed by a digest of the code
+        self._score_cache: "OrderedDict[bytes, Tuple[float, ...]]" = OrderedDict()
+        
         # Initialize learning history
         self.category_history = Counter()
+        # Running total of the history and the bias multipliers it implies,
+        # in category order; both are refreshed only when the history changes
+        self._history_total = 0
+        self._history_factors: Optional[Tuple[float, ...]] = None
     
     def categorize(self, code: str) -> Tuple[str, float, Dict[str, float]]:
         """
@@ -154,12 +278,54 @@ class AdvancedCodeCategorizer:
         Returns:
             Tuple containing (category, confidence, category_scores)
         """
+        return self._categorize(code, code.lower())
+    
+    def _categorize(self, code: str, code_lower: str) -> Tuple[str, float, Dict[str, float]]:
+        """Categorize code whose lowercased form has already been computed."""
+        # Fast reject: without a single trigger substring every score is zero
+        if not any(trigger in code_lower for trigger in self._triggers):
+            return "general", 0.0, {"general": 1.0}
+        
+        # Scores only depend on the code; the history bias is applied per call
+        best_category, confidence, normalized_scores = _combine_scores(
+            self._categories, self._weighted_scores(code), self._history_factors
+        )
+        
+        # Update history
+        self._record_category(best_category)
+        
+        return best_category, confidence, normalized_scores
+    
+    def _record_category(self, category: str) -> None:
+        """Add a categorization to the history and refresh the bias multipliers."""
+        history = self.category_history
+        history[category] += 1
+        self._history_total += 1
+        
+        # Add a small bias based on history (max 20% boost)
+        history_total = self._history_total + 1
+        self._history_factors = tuple(
+            1 + min(0.2, history[c] / history_total) if c in history else 1.0
+            for c in self._categories
+        )
+    
+    def _weighted_scores(self, code: str) -> Tuple[float, ...]:
+        """
+        Combine import, structure and keyword scores, reusing cached results.
+        
+        Returns:
+            Weighted score per category, in the order of self._categories
+        """
+        cache = self._score_cache
+        key = blake2b(code.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        category_scores = cache.get(key)
+        if category_scores is not None:
+            cache.move_to_end(key)
+            return category_scores
+        
         # Normalize code
         normalized_code = self._normalize_code(code)
         
-        # Calculate scores for each category
-        category_scores = {}
-        
         # Check for imports (strongest signal)
         import_scores = self._analyze_imports(normalized_code)
         
@@ -167,77 +333,53 @@ class AdvancedCodeCategorizer:
         structure_scores = self._analyze_structure(normalized_code)
         
         # Check for keywords
-        keyword_scores = self._analyze_keywords(normalized_code)
-        
-        # Combine scores with different weights
-        for category in self.category_keywords.keys():
-            # Import signals are strongest
-            import_weight = 3.0
-            # Structure patterns are strong signals
-            structure_weight = 2.0
-            # Keywords are weaker signals
-            keyword_weight = 1.0
-            
-            # Calculate weighted score
-            category_scores[category] = (
-                import_weight * import_scores.get(category, 0) +
-                structure_weight * structure_scores.get(category, 0) +
-                keyword_weight * keyword_scores.get(category, 0)
-            )
-        
-        # Apply history bias (slight preference for previously seen categories)
-        for category, count in self.category_history.items():
-            if category in category_scores:
-                # Add a small bias based on history (max 20% boost)
-                history_boost = min(0.2, count / (sum(self.category_history.values()) + 1))
-                category_scores[category] *= (1 + history_boost)
-        
-        # Get best category and confidence
-        if not category_scores:
-            return "general", 0.0, {"general": 1.0}
+        keyword_scores = self._analyze_keywords(normalized_code.lower())
         
-        best_category = max(category_scores, key=category_scores.get)
+        # Import signals are strongest
+        import_weight = 3.0
+        # Structure patterns are strong signals
+        structure_weight = 2.0
+        # Keywords are weaker signals
+        keyword_weight = 1.0
         
-        # Calculate confidence (normalize scores)
-        total_score = sum(category_scores.values())
-        if total_score > 0:
-            normalized_scores = {k: v/total_score for k, v in category_scores.items()}
-            confidence = normalized_scores[best_category]
-        else:
-            normalized_scores = {k: 0 for k in category_scores}
-            confidence = 0.0
+        # Combine scores with different weights, one slot per category
+        category_scores = tuple(
+            import_weight * import_scores.get(category, 0) +
+            structure_weight * structure_scores.get(category, 0) +
+            keyword_weight * keyword_scores.get(category, 0)
+            for category in self._categories
+        )
         
-        # Update history
-        self.category_history[best_category] += 1
-        
-        return best_category, confidence, normalized_scores
+        cache[key] = category_scores
+        if len(cache) > self.SCORE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return category_scores
     
     def _normalize_code(self, code: str) -> str:
         """Normalize code by removing comments and extra whitespace."""
         # Remove single-line comments
-        code = re.sub(r'#.*$', '', code, flags=re.MULTILINE)
+        code = _COMMENT_RE.sub('', code)
         
         # Remove multi-line strings and comments (simplified approach)
-        code = re.sub(r'""".*?"""', '', code, flags=re.DOTALL)
-        code = re.sub(r"'''.*?'''", '', code, flags=re.DOTALL)
+        if '"""' in code:
+            code = _TRIPLE_DOUBLE_RE.sub('', code)
+        if "'''" in code:
+            code = _TRIPLE_SINGLE_RE.sub('', code)
         
-        # Normalize whitespace
-        code = re.sub(r'\s+', ' ', code)
-        
-        return code
+        # Normalize whitespace; split/join collapses runs in C without the
+        # per-match overhead of a regex substitution
+        return ' '.join(code.split())
     
     def _analyze_imports(self, code: str) -> Dict[str, float]:
         """Analyze imports in the code to determine category."""
-        scores = {}
+        # Count imported modules in a single scan, then score categories
+        # from the counts instead of re-scanning the code per category
+        modules = Counter(name or from_name for name, from_name in _IMPORT_RE.findall(code))
         
-        for category, patterns in self.import_patterns.items():
-            category_score = 0
-            for pattern in patterns:
-                matches = re.findall(pattern, code)
-                category_score += len(matches)
-            
-            if category_score > 0:
-                scores[category] = category_score
+        scores = {}
+        for module, count in modules.items():
+            for category in self._module_categories.get(module, ()):
+                scores[category] = scores.get(category, 0) + count
         
         # Normalize scores
         total = sum(scores.values()) if scores else 1
@@ -245,48 +387,42 @@ class AdvancedCodeCategorizer:
     
     def _analyze_structure(self, code: str) -> Dict[str, float]:
         """Analyze code structure patterns to determine category."""
-        scores = {}
-        
-        for category, patterns in self.structure_patterns.items():
-            category_score = 0
-            for pattern in patterns:
-                matches = re.findall(pattern, code)
-                category_score += len(matches)
+        if self._structure_db is not None:
+            scores = Counter()
+            ids = self._structure_ids
+            
+            def on_match(pattern_id, start, end, flags, context):
+                scores[ids[pattern_id]] += 1
             
-            if category_score > 0:
-                scores[category] = category_score
+            self._structure_db.scan(code.encode('utf-8', 'surrogatepass'), match_event_handler=on_match)
+        else:
+            groups = self._structure_groups
+            scores = Counter(groups[match.lastindex] for match in self._structure_re.finditer(code))
         
         # Normalize scores
         total = sum(scores.values()) if scores else 1
         return {k: v/total for k, v in scores.items()}
     
-    def _analyze_keywords(self, code: str) -> Dict[str, float]:
-        """Analyze keywords in the code to determine category."""
-        scores = {}
-        
-        # Convert code to lowercase for case-insensitive matching
-        code_lower = code.lower()
+    def _analyze_keywords(self, code_lower: str) -> Dict[str, float]:
+        """Analyze keywords in lowercased code to determine category."""
+        scores = Counter()
         
-        for category, keyword_groups in self.category_keywords.items():
-            category_score = 0
-            
-            # Check high-weight keywords (weight: 3)
-            for keyword in keyword_groups["high"]:
-                count = code_lower.count(keyword.lower())
-                category_score += count * 3
-            
-            # Check medium-weight keywords (weight: 2)
-            for keyword in keyword_groups["medium"]:
-                count = code_lower.count(keyword.lower())
-                category_score += count * 2
-            
-            # Check low-weight keywords (weight: 1)
-            for keyword in keyword_groups["low"]:
-                count = code_lower.count(keyword.lower())
-                category_score += count
-            
-            if category_score > 0:
-                scores[category] = category_score
+        if self._keyword_automaton is not None:
+            # Single scan; skip overlapping repeats of a keyword so counts
+            # match str.count (e.g. "text" twice in "textext")
+            last_end = {}
+            for end, (keyword, targets) in self._keyword_automaton.iter(code_lower):
+                if end - len(keyword) < last_end.get(keyword, -1):
+                    continue
+                last_end[keyword] = end
+                for category, weight in targets:
+                    scores[category] += weight
+        else:
+            for keyword, targets in self._keyword_weights.items():
+                count = code_lower.count(keyword)
+                if count:
+                    for category, weight in targets:
+                        scores[category] += count * weight
         
         # Normalize scores
         total = sum(scores.values()) if scores else 1
@@ -303,10 +439,31 @@ class AdvancedCodeCategorizer:
         Returns:
             List of tuples containing (category, confidence)
         """
-        _, _, scores = self.categorize(code)
+        # Obvious code: if only one category has anchor hits, and enough of
+        # them, return it directly without running the full scorer. This
+        # only answers a single suggestion; callers asking for more get the
+        # full ranking.
+        code_lower = code.lower()
+        anchored = self._match_anchors(code_lower) if top_n == 1 else None
+        if anchored and len(anchored) == 1:
+            category, hits = next(iter(anchored.items()))
+            if hits >= _ANCHOR_THRESHOLD:
+                self._record_category(category)
+                return [(category, 1.0)]
+        
+        _, _, scores = self._categorize(code, code_lower)
         
         # Sort categories by score in descending order
         sorted_categories = sorted(scores.items(), key=lambda x: x[1], reverse=True)
         
         # Return top N categories
         return sorted_categories[:top_n]
+    
+    def _match_anchors(self, code_lower: str) -> Dict[str, int]:
+        """Count anchor substring hits per category using plain substring checks."""
+        anchored = {}
+        for category, anchors in _ANCHORS.items():
+            hits = sum(code_lower.count(anchor) for anchor in anchors)
+            if hits:
+                anchored[category] = hits
+        return anchored
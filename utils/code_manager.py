@@ -6,120 +6,180 @@ This module manages code detection, saving, and organization.
 
 import os
 import re
-import datetime
-from typing import Optional
+import time
+import functools
+from typing import List, Optional
+from utils.advanced_code_categorizer import AdvancedCodeCategorizer
+
+# Markdown python code block
+_PYTHON_BLOCK_RE = re.compile(r"```python(.*?)```", re.DOTALL)
+
+# Common Python patterns that indicate code outside a markdown block
+_CODE_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r"def\s+\w+\s*\(",  # Function definition
+    r"class\s+\w+\s*(\(.*?\))?:",  # Class definition
+    r"import\s+[\w\.]+",  # Import statement
+    r"from\s+[\w\.]+\s+import",  # From import statement
+    r"if\s+.+:",  # If statement
+    r"for\s+.+:",  # For loop
+    r"while\s+.+:",  # While loop
+    r"try:",  # Try block
+    r"except\s+",  # Except block
+    r"def\s+\w+\s*\([^)]\)\s->",  # Type-annotated function
+    r"@\w+",  # Decorator
+))
+
+# Line that starts a code block when extracting unfenced code. Whitespace
+# classes exclude newlines so every match stays on one line, and "import"
+# needs something after it, as the pattern is applied to stripped lines.
+_CODE_LINE = (r"[^\S\n]*(?:def[^\S\n]+\w+|class[^\S\n]+\w+|import[^\S\n]+\S|from[^\S\n]+.+[^\S\n]+import"
+              r"|if[^\S\n]+.+:|for[^\S\n]+.+:|while[^\S\n]+.+:)")
+_CODE_START_RE = re.compile(r"^" + _CODE_LINE, re.MULTILINE)
+
+# First line that ends a code block: not indented, not blank and not a code line
+_CODE_END_RE = re.compile(r"^(?! {4}|\t|[^\S\n]*$|" + _CODE_LINE + r")", re.MULTILINE)
+
+@functools.lru_cache(maxsize=256)
+def _detect_code(text: str) -> bool:
+    """Detect code in text; see CodeManager.detect_code."""
+    # Check for code blocks first
+    if "```python" in text and _PYTHON_BLOCK_RE.search(text):
+        return True
+    
+    # Check for common Python patterns
+    for pattern in _CODE_PATTERNS:
+        if pattern.search(text):
+            return True
+    
+    # Check if the text has multiple lines with Python-like indentation,
+    # counting line starts directly instead of splitting into a list
+    indented_lines = text.count('\n    ') + text.count('\n\t')
+    if text.startswith(('    ', '\t')):
+        indented_lines += 1
+    total_lines = text.count('\n') + 1
+    if indented_lines > 2 and indented_lines / total_lines > 0.3:
+        return True
+    
+    return False
 
 class CodeManager:
     """Manages code detection, saving, and organization."""
     
-    def __init__(self, save_folder: str = "bot_outputs"):
-        """Initialize code manager with specified save folder."""
+    def __init__(self, save_folder: str = "bot_outputs",
+                 categorizer: Optional[AdvancedCodeCategorizer] = None):
+        """Initialize code manager with specified save folder and optional shared categorizer."""
         self.save_folder = save_folder
         os.makedirs(save_folder, exist_ok=True)
+        # Created on first use when no categorizer is shared
+        self._categorizer = categorizer
+        # Timestamp of the last save, in nanoseconds
+        self._last_save_ns = 0
+        # Folders known to exist, so saves skip the makedirs call
+        self._created_dirs = {save_folder}
     
     def detect_code(self, text: str) -> bool:
         """
         Advanced code detection using multiple patterns and heuristics.
         """
-        # Check for code blocks first
-        if re.search(r"```python(.*?)```", text, re.DOTALL):
-            return True
-        
-        # Check for common Python patterns
-        patterns = [
-            r"def\s+\w+\s*\(",  # Function definition
-            r"class\s+\w+\s*(\(.*?\))?:",  # Class definition
-            r"import\s+[\w\.]+",  # Import statement
-            r"from\s+[\w\.]+\s+import",  # From import statement
-            r"if\s+.+:",  # If statement
-            r"for\s+.+:",  # For loop
-            r"while\s+.+:",  # While loop
-            r"try:",  # Try block
-            r"except\s+",  # Except block
-            r"def\s+\w+\s*\([^)]\)\s->",  # Type-annotated function
-            r"@\w+",  # Decorator
-        ]
-        
-        for pattern in patterns:
-            if re.search(pattern, text):
-                return True
-        
-        # Check if the text has multiple lines with Python-like indentation
-        lines = text.split('\n')
-        indented_lines = sum(1 for line in lines if line.startswith('    ') or line.startswith('\t'))
-        if indented_lines > 2 and indented_lines / len(lines) > 0.3:
-            return True
-        
-        return False
+        # Results are cached, since the same message is often checked repeatedly
+        return _detect_code(text)
     
-    def extract_code(self, text: str) -> str:
-        """Extract code from text, handling markdown code blocks."""
+    def extract_code(self, text: str) -> Optional[str]:
+        """
+        Extract code from text, handling markdown code blocks.
+        
+        Returns:
+            The extracted code, or None if the text contains no code
+        """
         # Try to extract from markdown code blocks first
-        code_blocks = re.findall(r"```python(.*?)```", text, re.DOTALL)
-        if code_blocks:
-            return code_blocks[0].strip()
+        match = self._find_python_block(text)
+        if match:
+            return match.group(1).strip()
         
         # If no code blocks, try to extract based on indentation and patterns
-        lines = text.split('\n')
-        code_lines = []
-        in_code_block = False
+        return self._extract_unfenced(text)
+    
+    def detect_and_extract(self, text: str) -> List[str]:
+        """
+        Detect and extract code from text in a single pass over markdown blocks.
         
-        for line in lines:
-            # Check for code-like patterns
-            if re.match(r"(def\s+\w+|class\s+\w+|import\s+|from\s+.+\s+import|if\s+.+:|for\s+.+:|while\s+.+:)", line.strip()):
-                in_code_block = True
-                code_lines.append(line)
-            # Check for indented lines (part of code block)
-            elif line.startswith('    ') or line.startswith('\t'):
-                if in_code_block:
-                    code_lines.append(line)
-            # Empty lines within code blocks are kept
-            elif line.strip() == '' and in_code_block:
-                code_lines.append(line)
-            # Other lines might end the code block
-            else:
-                in_code_block = False
+        Returns:
+            List with the extracted code, or an empty list if the text has no code
+        """
+        match = self._find_python_block(text)
+        if match:
+            code = match.group(1).strip()
+        else:
+            # Unfenced code only counts when the detection heuristics agree
+            code = self._extract_unfenced(text)
+            if code and not self.detect_code(text):
+                code = None
+        return [code] if code else []
+    
+    def _find_python_block(self, text: str) -> Optional[re.Match]:
+        """Find the first python markdown block, skipping the regex when there is no python fence."""
+        if "```python" not in text:
+            return None
+        return _PYTHON_BLOCK_RE.search(text)
+    
+    def _extract_unfenced(self, text: str) -> Optional[str]:
+        """Extract code without markdown blocks based on indentation and patterns."""
+        # A block starts at a code-like line and runs, through indented and
+        # empty lines, up to the next line that is neither; both ends are
+        # found by regex so the text is never split into lines
+        blocks = []
+        pos = 0
+        while True:
+            start = _CODE_START_RE.search(text, pos)
+            if start is None:
+                break
+            line_end = text.find('\n', start.start())
+            end = _CODE_END_RE.search(text, line_end + 1) if line_end != -1 else None
+            if end is None:
+                blocks.append(text[start.start():])
+                break
+            blocks.append(text[start.start():end.start() - 1])
+            pos = end.start()
         
-        return '\n'.join(code_lines)
+        return '\n'.join(blocks) or None
     
     def save_code(self, code: str, category: str = "general") -> str:
         """Save code to a file with timestamp and category."""
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Local time to the second, plus nanoseconds so that saves within
+        # the same second get distinct filenames; kept strictly increasing
+        # for clocks too coarse to tell consecutive saves apart
+        now_ns = max(time.time_ns(), self._last_save_ns + 1)
+        self._last_save_ns = now_ns
+        seconds, nanos = divmod(now_ns, 1_000_000_000)
+        timestamp = f"{time.strftime('%Y%m%d_%H%M%S', time.localtime(seconds))}_{nanos:09d}"
         category_folder = os.path.join(self.save_folder, category)
-        os.makedirs(category_folder, exist_ok=True)
+        # Only create each folder once per session
+        if category_folder not in self._created_dirs:
+            os.makedirs(category_folder, exist_ok=True)
+            self._created_dirs.add(category_folder)
         
         filename = f"{category_folder}/code_{timestamp}.py"
         
+        # Encode once and hand the bytes straight to the OS, skipping the
+        # text I/O layer; unencodable characters (lone surrogates) are replaced
+        data = memoryview(code.encode('utf-8', errors='replace'))
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+        try:
+            fd = os.open(filename, flags, 0o644)
+        except FileNotFoundError:
+            # The folder was removed since it was created; recreate it
+            os.makedirs(category_folder, exist_ok=True)
+            fd = os.open(filename, flags, 0o644)
         try:
-            with open(filename, "w", encoding='utf-8') as f:
-                f.write(code)
-        except UnicodeEncodeError:
-            # Fallback to ASCII encoding if UTF-8 fails
-            with open(filename, "w", encoding='ascii', errors='replace') as f:
-                f.write(code)
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
         
         return filename
     
     def categorize_code(self, code: str) -> str:
         """Attempt to categorize code based on content analysis."""
-        categories = {
-            "data_analysis": ["pandas", "numpy", "matplotlib", "seaborn", "data", "dataframe", "plot"],
-            "web": ["flask", "django", "fastapi", "html", "http", "request", "api"],
-            "ml": ["sklearn", "tensorflow", "keras", "model", "train", "predict"],
-            "utility": ["util", "helper", "tool", "function"],
-            "database": ["sql", "database", "query", "sqlite", "mysql", "postgresql"],
-            "file_io": ["file", "open", "read", "write", "csv", "json", "load", "save"],
-        }
-        
-        # Default category
-        best_category = "general"
-        best_score = 0
-        
-        # Check each category
-        for category, keywords in categories.items():
-            score = sum(1 for keyword in keywords if keyword.lower() in code.lower())
-            if score > best_score:
-                best_score = score
-                best_category = category
-        
-        return best_category
+        if self._categorizer is None:
+            self._categorizer = AdvancedCodeCategorizer()
+        return self._categorizer.categorize(code)[0]
@@ -0,0 +1,47 @@
+"""
+JSON Utilities Module
+
+This module provides JSON serialization helpers that use orjson when it is
+installed and fall back to the standard library otherwise.
+"""
+
+import json
+from typing import Any, Union
+
+# Try importing optional dependencies with fallbacks
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def json_dumps(obj: Any, sort_keys: bool = False, indent: bool = False) -> bytes:
+    """
+    Serialize an object to UTF-8 encoded JSON.
+    
+    Args:
+        obj: Object to serialize
+        sort_keys: Whether to sort dictionary keys (for stable output)
+        indent: Pretty-print with two-space indentation instead of compact output
+        
+    Returns:
+        JSON document as bytes
+    """
+    if ORJSON_AVAILABLE:
+        option = 0
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    
+    return json.dumps(obj, sort_keys=sort_keys, ensure_ascii=False,
+                      indent=2 if indent else None,
+                      separators=(',', ': ' if indent else ':')).encode('utf-8')
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """Deserialize a JSON document from bytes or str."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    
+    return json.loads(data)